@@ -914,27 +914,26 @@ class jump_non(Command):
     def _non(fobj, is_directory):
         return fobj.is_directory if not is_directory else not fobj.is_directory
 
+    def _find(self, files, indices, is_directory):
+        for i in indices:
+            if self._non(files[i], is_directory):
+                return files[i]
+        return None
+
     def execute(self):
         tfile = self.fm.thisfile
-        passed = False
-        found_before = None
-        found_after = None
-        for fobj in self.fm.thisdir.files[::-1] if self._flag_reverse else self.fm.thisdir.files:
-            if fobj.path == tfile.path:
-                passed = True
-                continue
+        files = self.fm.thisdir.files
+        indices = range(len(files))
+        if self._flag_reverse:
+            indices = indices[::-1]
+        index = self.fm.thisdir.index_of(tfile.path)
+        position = len(indices) if index is None else indices.index(index)
 
-            if passed:
-                if self._non(fobj, tfile.is_directory):
-                    found_after = fobj.path
-                    break
-            elif not found_before and self._non(fobj, tfile.is_directory):
-                found_before = fobj.path
-
-        if found_after:
-            self.fm.select_file(found_after)
-        elif self._flag_wrap and found_before:
-            self.fm.select_file(found_before)
+        found = self._find(files, indices[position + 1:], tfile.is_directory)
+        if found is None and self._flag_wrap:
+            found = self._find(files, indices[:position], tfile.is_directory)
+        if found is not None:
+            self.fm.select_file(found.path)
 
 
 class mark_tag(Command):
@@ -2135,6 +2134,18 @@ class flat(Command):
         self.fm.thisdir.load_content()
 
 
+class frame_stats(Command):
+    """:frame_stats
+
+    Display how many frames were drawn and how long drawing them took, and
+    how well the cache of rendered lines of the browser columns works.
+    """
+    def execute(self):
+        from ranger.gui.widgets.browsercolumn import LINE_CACHE
+        self.fm.notify(self.fm.ui.get_frame_stats() + "; line cache: "
+                       + LINE_CACHE.get_stats())
+
+
 class reset_previews(Command):
     """:reset_previews
 
@@ -0,0 +1,73 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""The files which were yanked or cut.
+
+>>> from collections import namedtuple
+>>> Fobj = namedtuple('Fobj', 'path')
+>>> buf = CopyBuffer([Fobj('/a')])
+>>> buf.has_path('/a'), buf.has_path('/b')
+(True, False)
+>>> generation = buf.generation
+>>> buf.add(Fobj('/b'))
+>>> buf.has_path('/b'), buf.generation != generation
+(True, True)
+>>> buf.clear()
+>>> buf.has_path('/a')
+False
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from itertools import count
+
+# Shared by all copy buffers, so a new buffer never repeats a generation
+_GENERATIONS = count()
+
+
+def _changes(method):
+    def changing_method(self, *args):
+        result = method(self, *args)
+        self.generation = next(_GENERATIONS)
+        self._paths = None  # pylint: disable=protected-access
+        return result
+    changing_method.__name__ = method.__name__
+    changing_method.__doc__ = method.__doc__
+    return changing_method
+
+
+class CopyBuffer(set):
+    """A set of file objects which also answers whether a path is in it
+
+    Every change of the set gives it a new generation.
+    """
+
+    def __init__(self, *args):
+        set.__init__(self, *args)
+        self.generation = next(_GENERATIONS)
+        self._paths = None
+
+    def has_path(self, path):
+        if self._paths is None:
+            self._paths = set(fobj.path for fobj in self)
+        return path in self._paths
+
+    add = _changes(set.add)
+    clear = _changes(set.clear)
+    discard = _changes(set.discard)
+    pop = _changes(set.pop)
+    remove = _changes(set.remove)
+    update = _changes(set.update)
+    difference_update = _changes(set.difference_update)
+    intersection_update = _changes(set.intersection_update)
+    symmetric_difference_update = _changes(set.symmetric_difference_update)
+    __ior__ = _changes(set.__ior__)
+    __iand__ = _changes(set.__iand__)
+    __isub__ = _changes(set.__isub__)
+    __ixor__ = _changes(set.__ixor__)
+
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
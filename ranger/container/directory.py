@@ -1,23 +1,32 @@
 # This file is part of ranger, the console file manager.
 # License: GNU GPL version 3, see the file "AUTHORS" for details.
 
+# pylint: disable=too-many-lines
+
 from __future__ import (absolute_import, division, print_function)
 
 import locale
 import os.path
-from os import stat as os_stat, lstat as os_lstat
+try:
+    from os import scandir
+except ImportError:
+    scandir = None  # pylint: disable=invalid-name
 import random
 import re
 from collections import deque
 from time import time
 
 from ranger.container.fsobject import BAD_INFO, FileSystemObject
+from ranger.container.marked_items import MarkedItems
 from ranger.core import filter_stack
-from ranger.core.filter_stack import InodeFilterConstants, accept_file
+from ranger.core.cumulative_size import CumulativeSizeLoader
+from ranger.core.filter_stack import InodeFilterConstants
 from ranger.core.loader import Loadable
 from ranger.ext.mount_path import mount_path
+from ranger.ext.scan_dir import scan_entries, scan_tree, stat_entry
 from ranger.container.file import File
 from ranger.ext.accumulator import Accumulator
+from ranger.ext.iter_tools import threaded_map
 from ranger.ext.lazy_property import lazy_property
 from ranger.ext.human_readable import human_readable
 from ranger.container.settings import LocalSettings
@@ -59,25 +68,165 @@ def sort_unicode_wrapper_list(old_sort_func):
     return sort_unicode
 
 
-def walklevel(some_dir, level):
-    some_dir = some_dir.rstrip(os.path.sep)
-    followlinks = level > 0
-    assert os.path.isdir(some_dir)
-    num_sep = some_dir.count(os.path.sep)
-    for root, dirs, files in os.walk(some_dir, followlinks=followlinks):
-        yield root, dirs, files
-        num_sep_this = root.count(os.path.sep)
-        if level != -1 and num_sep + level <= num_sep_this:
-            del dirs[:]
+_NUMBER_RE = re.compile(r'[0-9]+')
+_NATURAL_CHUNK_RE = re.compile(r'[0-9]+|[^0-9]+')
+
+# Cache of the natural sort keys which involve locale.strxfrm()
+_COLLATED_NATURAL_KEYS = {}
+COLLATED_NATURAL_KEYS_MAX = 100000
+
+
+def _encode_number(match):
+    # A "0" sorts numbers where the digit 0 would be, the length of the
+    # number without leading zeros and then the digits themselves order
+    # numbers of any length by their value, within a plain string.
+    digits = match.group().lstrip('0')
+    return '0' + chr(len(digits)) + digits
+
+
+def _collated_natural_key(name, zero):
+    key = []
+    for chunk in _NATURAL_CHUNK_RE.findall(name):
+        if chunk[0] in '0123456789':
+            key.append((zero, int(chunk)))
+        else:
+            key.append((locale.strxfrm(chunk), 0))
+    return key
+
+
+def natural_sort_keys(files, case_insensitive=False, collate=False):
+    """Returns the keys for sorting the files naturally, computed in one pass
+
+    Without collate, every key is a single string which orders like
+    FileSystemObject.basename_natural, but is much cheaper to build and to
+    compare.  With collate, the text between the numbers is compared with
+    the collation rules of the locale, and the keys are cached by name.
+    """
+    if case_insensitive:
+        names = [fobj.relative_path_lower for fobj in files]
+    else:
+        names = [fobj.relative_path for fobj in files]
+    if not collate:
+        encode = _NUMBER_RE.sub
+        return [encode(_encode_number, name) for name in names]
+
+    zero = locale.strxfrm('0')
+    cache = _COLLATED_NATURAL_KEYS
+    if len(cache) > COLLATED_NATURAL_KEYS_MAX:
+        cache.clear()
+    keys = []
+    for name in names:
+        key = cache.get(name)
+        if key is None:
+            key = cache[name] = _collated_natural_key(name, zero)
+        keys.append(key)
+    return keys
+
+
+def locale_collates():
+    """Whether the locale's collation differs from comparing code points"""
+    try:
+        name = locale.setlocale(locale.LC_COLLATE)
+    except locale.Error:
+        return False
+    return name.split('.', 1)[0] not in ('C', 'POSIX')
+
+
+_REGEX_SPECIAL_CHARS = frozenset('.^$*+?{}[]|()')
+
+
+def regex_literal(pattern):
+    """Returns the string a regex pattern matches literally, or None
+
+    >>> regex_literal(r'foo\\.txt')
+    'foo.txt'
+    >>> regex_literal('fo+') is None
+    True
+    """
+    chars = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            if char.isalnum():
+                return None  # a character class like \d
+            chars.append(char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in _REGEX_SPECIAL_CHARS:
+            return None
+        else:
+            chars.append(char)
+    return None if escaped else ''.join(chars)
+
+
+def _set_is_stricter(old_signature, signature):
+    return isinstance(old_signature, frozenset) and \
+        isinstance(signature, frozenset) and signature <= old_signature
+
+
+def _regex_is_stricter(old_signature, signature):
+    (old_pattern, old_flags), (pattern, flags) = old_signature, signature
+    if old_flags != flags:
+        return False
+    old_literal, literal = regex_literal(old_pattern), regex_literal(pattern)
+    if old_literal is None or literal is None:
+        return False
+    if flags & re.IGNORECASE:
+        old_literal, literal = old_literal.lower(), literal.lower()
+    return old_literal in literal
+
+
+# The kinds of filter layers which can tell if their new signature is stricter
+_STRICTER_TESTS = {
+    'narrow': _set_is_stricter,
+    'inode': _set_is_stricter,
+    'temporary': _regex_is_stricter,
+}
+
+
+def filter_is_stricter(kind, old_signature, signature):
+    """Whether a filter layer lets only files through that it let through before"""
+    if old_signature is None:
+        return True
+    if signature is None or kind not in _STRICTER_TESTS:
+        return False
+    return _STRICTER_TESTS[kind](old_signature, signature)
+
+
+# How the input of a filter layer compares to the last time
+_FILTER_INPUT_SAME, _FILTER_INPUT_SUBSET, _FILTER_INPUT_OTHER = 0, 1, 2
+
+
+def _apply_filter_layer(layer, cached, files, state):
+    """Returns the files which pass a filter layer, and the state for the next
+
+    cached is the (signature, files) of the layer from the last time.
+    """
+    kind, signature, func = layer
+    old_signature, old_files = cached
+    if state == _FILTER_INPUT_OTHER or not (
+            signature == old_signature
+            or filter_is_stricter(kind, old_signature, signature)):
+        if func is not None:
+            files = [fobj for fobj in files if func(fobj)]
+        return files, _FILTER_INPUT_OTHER
 
+    # Only files which passed the last time can pass now
+    if old_files is None:
+        candidates = files
+    elif state == _FILTER_INPUT_SAME:
+        candidates = old_files
+    else:
+        passed = set(map(id, old_files))
+        candidates = [fobj for fobj in files if id(fobj) in passed]
+    if signature == old_signature or func is None:
+        return candidates, state
+    return [fobj for fobj in candidates if func(fobj)], _FILTER_INPUT_SUBSET
 
-def mtimelevel(path, level):
-    mtime = os.stat(path).st_mtime
-    for dirpath, dirnames, _ in walklevel(path, level):
-        dirlist = [os.path.join("/", dirpath, d) for d in dirnames
-                   if level == -1 or dirpath.count(os.path.sep) - path.count(os.path.sep) <= level]
-        mtime = max([mtime] + [os.stat(d).st_mtime for d in dirlist])
-    return mtime
+
+# Sort keys which can be computed without knowing the stat() of the files
+SORT_KEYS_WITHOUT_STAT = frozenset(('basename', 'natural', 'random', 'type', 'extension'))
 
 
 class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public-methods
@@ -96,15 +245,38 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
     temporary_filter = None
     narrow_filter = None
     inode_type_filter = None
+
+    # Incremented when the files in files_all or their order change
+    files_generation = 0
+    sort_generation = 0
+    # Incremented on the class when a setting changes that affects the order
+    # or the filtering of the files of every directory.  Instead of reacting
+    # to the change right away, each directory compares them with the
+    # generations it last sorted and filtered with in sort_if_outdated().
+    order_settings_generation = 0
+    filter_settings_generation = 0
+    _sorted_settings_generation = -1
+    _filtered_settings_generation = -1
+    _filter_cache = None
+    _filter_files_generation = -1
+    _filter_sort_generation = -1
+    _path_index = None  # path -> index in files, built by index_of()
+    _path_index_files = None
+    _hidden_pattern = None
+    _hidden_regex = None
+    _hidden_flags = None
     marked_items = None
     old_marked_items = None  #add by sim1
+    _gc_filenames = None  # the filenames _gc_marked_items() last ran with
     scroll_begin = 0
 
     mount_path = '/'
-    disk_usage = 0
+    _disk_usage = 0
+    stat_deferred = False
 
     last_update_time = -1
     load_content_mtime = -1
+    flat_mtimes = None
 
     order_outdated = False
     content_outdated = False
@@ -114,6 +286,7 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
     _vcs_signal_handler_installed = False
 
     cumulative_size_calculated = False
+    size_loader = None
 
     sort_dict = {
         'basename': sort_by_basename,
@@ -134,20 +307,14 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
         Accumulator.__init__(self)
         FileSystemObject.__init__(self, path, **kw)
 
-        self.marked_items = []
-        self.old_marked_items = []  #add by sim1
+        self.marked_items = MarkedItems()
+        self.old_marked_items = MarkedItems()  #add by sim1
+        # (sort, sort_case_insensitive, sort_unicode) -> sorted files_all
+        self.sort_orders = {}
 
         self.filter_stack = []
 
-        self._signal_functions = []
-        func = self.signal_function_factory(self.sort)
-        self._signal_functions += [func]
-        for opt in ('sort_directories_first', 'sort', 'sort_reverse', 'sort_case_insensitive'):
-            self.settings.signal_bind('setopt.' + opt, func, weak=True, autosort=False)
-        func = self.signal_function_factory(self.refilter)
-        self._signal_functions += [func]
-        for opt in ('hidden_filter', 'show_hidden'):
-            self.settings.signal_bind('setopt.' + opt, func, weak=True, autosort=False)
+        self._signal_handlers = []
 
         self.settings = LocalSettings(path, self.settings)
 
@@ -196,22 +363,58 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
     @lazy_property
     def vcs(self):
         if not self._vcs_signal_handler_installed:
-            self.settings.signal_bind(
+            self._signal_handlers.append(self.settings.signal_bind(
                 'setopt.vcs_aware', self.vcs__reset,  # pylint: disable=no-member
                 weak=True, autosort=False,
-            )
+            ))
             self._vcs_signal_handler_installed = True
         if self.settings.vcs_aware:
             return Vcs(self)
         return None
 
-    def signal_function_factory(self, function):
-        def signal_function():
-            self.load_if_outdated()
-            if not self.exists:
-                return
-            function()
-        return signal_function
+    def unbind_signals(self):
+        """Remove the signal handlers of this directory from the settings"""
+        for handler in self._signal_handlers:
+            self.settings.signal_unbind(handler)
+        self._signal_handlers = []
+        self._vcs_signal_handler_installed = False
+
+    @classmethod
+    def outdate_order(cls):
+        """Mark the order of the files in all directories as outdated"""
+        cls.order_settings_generation += 1
+
+    @classmethod
+    def outdate_filter(cls):
+        """Mark the filtered files of all directories as outdated"""
+        cls.filter_settings_generation += 1
+
+    def apply_settings(self):
+        """Sort and filter again if the settings changed since the last time"""
+        self.load_if_outdated()
+        if self.exists:
+            self.sort_if_outdated()
+
+    @property
+    def disk_usage(self):
+        """The summed up size of the files in this directory"""
+        if self._disk_usage is None:
+            self.load_deferred_stats()
+            self._disk_usage = sum(fobj.size for fobj in self.files_all or ()
+                                   if not fobj.is_directory)
+        return self._disk_usage
+
+    @disk_usage.setter
+    def disk_usage(self, value):
+        self._disk_usage = value
+
+    def load_deferred_stats(self):
+        """Load the entries whose stat() was deferred by the lazy_stat setting"""
+        if self.stat_deferred and self.files_all is not None:
+            for fobj in self.files_all:
+                fobj.load_once()
+            self.stat_deferred = False
+            self.sort_orders.clear()
 
     def request_resort(self):
         self.order_outdated = True
@@ -225,14 +428,11 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
     def mark_item(self, item, val):
         item.mark_set(val)
         if val:
-            if item in self.files and item not in self.marked_items:
+            index = self.index_of(item.path)
+            if index is not None and self.files[index] is item:
                 self.marked_items.append(item)
         else:
-            while True:
-                try:
-                    self.marked_items.remove(item)
-                except ValueError:
-                    break
+            self.marked_items.discard(item)
 
     def toggle_mark(self, item):
         self.mark_item(item, not item.marked)
@@ -246,20 +446,26 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
             self.mark_item(item, val)
 
         if not val:
-            del self.marked_items[:]
             self._clear_marked_items()
 
-    # XXX: Is it really necessary to have the marked items in a list?
-    # Can't we just recalculate them with [f for f in self.files if f.marked]?
     def _gc_marked_items(self):
-        for item in list(self.marked_items):
-            if item.path not in self.filenames:
-                self.marked_items.remove(item)
+        """Forget the marked items which are no longer in this directory"""
+        filenames = self.filenames
+        if filenames is self._gc_filenames:
+            return  # only files in filenames can have been marked since
+        if filenames is None:
+            self.marked_items.clear()
+        elif self.marked_items:
+            names = set(filenames)
+            for path in list(self.marked_items.paths()):
+                if path not in names:
+                    self.marked_items.discard_path(path)
+        self._gc_filenames = filenames
 
     def _clear_marked_items(self):
         for item in self.marked_items:
             item.mark_set(False)
-        del self.marked_items[:]
+        self.marked_items.clear()
 
     def get_selection(self):
         """READ ONLY"""
@@ -280,30 +486,69 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
 
         self.last_update_time = time()
 
-        filters = []
+        self.files = self._apply_filter_layers()
+        self._path_index = None
+        self._filtered_settings_generation = self.filter_settings_generation
 
-        if not self.settings.show_hidden and self.settings.hidden_filter:
-            hidden_filter = re.compile(self.settings.hidden_filter)
-            hidden_filter_search = hidden_filter.search
+        # A fix for corner cases when the user invokes show_hidden on a
+        # directory that contains only hidden directories and hidden files.
+        if self.files and not self.pointed_obj:
+            self.pointed_obj = self.files[0]
+        elif not self.files:
+            self.content_loaded = False
+            self.pointed_obj = None
 
-            def hidden_filter_func(fobj):
-                for comp in fobj.relative_path.split(os.path.sep):
+        self.move_to_obj(self.pointed_obj)
+
+    def _get_hidden_filter(self, pattern):
+        if pattern != self._hidden_pattern:
+            self._hidden_pattern = pattern
+            self._hidden_regex = re.compile(pattern)
+            self._hidden_flags = {}
+        flags = self._hidden_flags
+        if len(flags) > 2 * len(self.files_all) + 100:
+            flags.clear()  # don't keep the names of long gone files around
+        hidden_filter_search = self._hidden_regex.search
+
+        def hidden_filter_func(fobj):
+            path = fobj.relative_path
+            try:
+                return flags[path]
+            except KeyError:
+                visible = True
+                for comp in path.split(os.path.sep):
                     if hidden_filter_search(comp):
-                        return False
-                return True
-            filters.append(hidden_filter_func)
+                        visible = False
+                        break
+                flags[path] = visible
+                return visible
+        return hidden_filter_func
+
+    def _get_filter_layers(self):
+        """Returns a (kind, signature, function) tuple for each layer of filters
+
+        An unchanged signature means that the layer lets the same files
+        through as on the last refilter.  Layers without a function let all
+        files through and have the signature None.
+        """
+        layers = []
+
+        if not self.settings.show_hidden and self.settings.hidden_filter:
+            pattern = self.settings.hidden_filter
+            layers.append(('hidden', pattern, self._get_hidden_filter(pattern)))
+        else:
+            layers.append(('hidden', None, None))
+
         if self.narrow_filter:
-            # pylint: disable=unsupported-membership-test
+            names = frozenset(self.narrow_filter)
+            layers.append(('narrow', names, lambda fobj: fobj.basename in names))
+        else:
+            layers.append(('narrow', None, None))
 
-            # Pylint complains that self.narrow_filter is by default
-            # None but the execution won't reach this line if it is
-            # still None.
-            filters.append(lambda fobj: fobj.basename in self.narrow_filter)
-        if self.settings.global_inode_type_filter or self.inode_type_filter:
+        # Use local inode_type_filter if present, global otherwise
+        inode_filter = self.inode_type_filter or self.settings.global_inode_type_filter
+        if inode_filter:
             def inode_filter_func(obj):
-                # Use local inode_type_filter if present, global otherwise
-                inode_filter = self.inode_type_filter or self.settings.global_inode_type_filter
-                # Apply filter
                 if InodeFilterConstants.DIRS in inode_filter and \
                         obj.is_directory:
                     return True
@@ -319,23 +564,59 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
                     return True
                 #add by sim1 ------------------------------------------
                 return False
-            filters.append(inode_filter_func)
+            if InodeFilterConstants.RATINGS in inode_filter:
+                # The result holds until the ratings change
+                signature = (frozenset(inode_filter), self.fm.ratings.generation)
+            else:
+                signature = frozenset(inode_filter)
+            layers.append(('inode', signature, inode_filter_func))
+        else:
+            layers.append(('inode', None, None))
+
         if self.temporary_filter:
-            temporary_filter_search = self.temporary_filter.search
-            filters.append(lambda fobj: temporary_filter_search(fobj.basename))
-        filters.extend(self.filter_stack)
+            regex = self.temporary_filter
+            temporary_filter_search = regex.search
+            layers.append(('temporary', (regex.pattern, regex.flags),
+                           lambda fobj: temporary_filter_search(fobj.basename)))
+        else:
+            layers.append(('temporary', None, None))
 
-        self.files = [f for f in self.files_all if accept_file(f, filters)]
+        for filt in self.filter_stack:
+            if filt:
+                layers.append(('stack', filt, filt))
+        return layers
 
-        # A fix for corner cases when the user invokes show_hidden on a
-        # directory that contains only hidden directories and hidden files.
-        if self.files and not self.pointed_obj:
-            self.pointed_obj = self.files[0]
-        elif not self.files:
-            self.content_loaded = False
-            self.pointed_obj = None
+    def _apply_filter_layers(self):
+        """Returns the files which pass all filters
 
-        self.move_to_obj(self.pointed_obj)
+        The result of each layer is kept.  Layers in front of the first one
+        that changed are not evaluated again, and a layer that only became
+        stricter is evaluated against its previous result only.
+        """
+        cache = self._filter_cache
+        if cache is None or self._filter_files_generation != self.files_generation:
+            cache = []
+            state = _FILTER_INPUT_OTHER
+        elif self._filter_sort_generation != self.sort_generation:
+            state = _FILTER_INPUT_SUBSET  # the same files in another order
+        else:
+            state = _FILTER_INPUT_SAME
+
+        files = self.files_all
+        new_cache = []
+        for i, layer in enumerate(self._get_filter_layers()):
+            kind, signature, func = layer
+            if i < len(cache) and cache[i][0] == kind:
+                cached = cache[i][1:]
+            else:
+                cached = (None, None)
+            files, state = _apply_filter_layer(layer, cached, files, state)
+            new_cache.append((kind, signature, None if func is None else files))
+
+        self._filter_cache = new_cache
+        self._filter_files_generation = self.files_generation
+        self._filter_sort_generation = self.sort_generation
+        return files
 
     # XXX: Check for possible race conditions
     # pylint: disable=too-many-locals,too-many-branches,too-many-statements
@@ -350,7 +631,7 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
         self.percent = 0
         self.load_if_outdated()
 
-        basename_is_rel_to = self.path if self.flat else None
+        lazy = scandir is not None and not self.flat and self.settings.lazy_stat
 
         try:  # pylint: disable=too-many-nested-blocks
             if self.runnable:
@@ -360,19 +641,18 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
                 self.mount_path = mount_path(mypath)
 
                 if self.flat:
-                    filelist = []
-                    for dirpath, dirnames, filenames in walklevel(mypath, self.flat):
-                        dirlist = [
-                            os.path.join("/", dirpath, d)
-                            for d in dirnames
-                            if self.flat == -1
-                            or (dirpath.count(os.path.sep)
-                                - mypath.count(os.path.sep)) <= self.flat
-                        ]
-                        filelist += dirlist
-                        filelist += [os.path.join("/", dirpath, f) for f in filenames]
-                    filenames = filelist
-                    self.load_content_mtime = mtimelevel(mypath, self.flat)
+                    filenames = []
+                    flat_mtimes = {}
+                    for _, entries in scan_tree(mypath, self.flat, flat_mtimes):
+                        filenames.extend(entry[0] for entry in entries)
+                        yield
+                    filelist = filenames
+                    self.flat_mtimes = flat_mtimes
+                    self.load_content_mtime = flat_mtimes.get(mypath, -1)
+                elif lazy:
+                    filelist = scan_entries(mypath)
+                    filenames = [entry[0] for entry in filelist]
+                    self.load_content_mtime = os.stat(mypath).st_mtime
                 else:
                     filelist = os.listdir(mypath)
                     filenames = [mypath + (mypath == '/' and fname or '/' + fname)
@@ -399,81 +679,56 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
 
                 yield
 
-                marked_paths = [obj.path for obj in self.marked_items]
+                marked_paths = set(self.marked_items.paths())
+                # Entries which are still there keep their objects, so only
+                # new names need new objects and only changed files a load()
+                if self.files_all is not None and not self.flat:
+                    old_items = dict((item.path, item) for item in self.files_all)
+                else:
+                    old_items = {}
 
                 files = []
                 disk_usage = 0
-
                 has_vcschild = False
-                for name in filenames:
-                    try:
-                        file_lstat = os_lstat(name)
-                        if file_lstat.st_mode & 0o170000 == 0o120000:
-                            file_stat = os_stat(name)
-                        else:
-                            file_stat = file_lstat
-                    except OSError:
-                        file_lstat = None
-                        file_stat = None
-                    if file_lstat and file_stat:
-                        stats = (file_stat, file_lstat)
-                        is_a_dir = file_stat.st_mode & 0o170000 == 0o040000
-                    else:
-                        stats = None
-                        is_a_dir = False
-
-                    if is_a_dir:
-                        item = self.fm.get_directory(name, preload=stats, path_is_abs=True,
-                                                     basename_is_rel_to=basename_is_rel_to)
-                        item.load_if_outdated()
-                        if self.flat:
-                            item.relative_path = os.path.relpath(item.path, self.path)
-                        else:
-                            item.relative_path = item.basename
-                        item.relative_path_lower = item.relative_path.lower()
-                        if item.vcs and item.vcs.track:
-                            if item.vcs.is_root_pointer:
-                                has_vcschild = True
-                            else:
-                                item.vcsstatus = \
-                                    item.vcs.rootvcs.status_subpath(  # pylint: disable=no-member
-                                        os.path.join(self.realpath, item.basename),
-                                        is_directory=True,
-                                    )
+                listing = [] if self._use_listing_cache() else None
+
+                if lazy:
+                    entries = filelist
+                else:
+                    # On network file systems each stat() is a round trip,
+                    # so it pays off to have several of them in flight.
+                    entries = threaded_map(stat_entry, filenames,
+                                           self.settings.stat_pool_size)
+                for entry in entries:
+                    if lazy:
+                        # Leave the stat() to FileSystemObject.load_once()
+                        name, is_a_dir, is_link = entry
+                        item = self._make_item(name, None, is_a_dir, is_link,
+                                               old_items.get(name))
                     else:
-                        item = File(name, preload=stats, path_is_abs=True,
-                                    basename_is_rel_to=basename_is_rel_to)
-                        item.load()
+                        name, stats, is_a_dir = entry
+                        item = self._make_item(name, stats, is_a_dir,
+                                               old_item=old_items.get(name))
+                        if listing is not None:
+                            listing.append((name, stats))
+
+                    if item.is_directory:
+                        if item.vcs and item.vcs.track and item.vcs.is_root_pointer:
+                            has_vcschild = True
+                    elif not lazy:
                         disk_usage += item.size
-                        if self.vcs and self.vcs.track:
-                            item.vcsstatus = \
-                                self.vcs.rootvcs.status_subpath(  # pylint: disable=no-member
-                                    os.path.join(self.realpath, item.basename))
 
                     files.append(item)
                     self.percent = 100 * len(files) // len(filenames)
                     yield
                 self.has_vcschild = has_vcschild
-                self.disk_usage = disk_usage
-
-                self.filenames = filenames
-                self.files_all = files
-
-                self._clear_marked_items()
-                for item in self.files_all:
-                    if item.path in marked_paths:
-                        item.mark_set(True)
-                        self.marked_items.append(item)
-                    else:
-                        item.mark_set(False)
+                self.stat_deferred = lazy
+                self.disk_usage = None if lazy else disk_usage
 
-                self.sort()
+                self._set_files(files, filenames, marked_paths)
 
-                if files:
-                    if self.pointed_obj is not None:
-                        self.sync_index()
-                    else:
-                        self.move(to=0)
+                if listing is not None:
+                    self.fm.listing_cache.store(mypath, self.load_content_mtime, listing)
             else:
                 self.filenames = None
                 self.files_all = None
@@ -491,10 +746,304 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
                 self.fm.ui.vcsthread.process(self)
     # pylint: enable=too-many-locals,too-many-branches,too-many-statements
 
+    def _make_item(  # pylint: disable=too-many-arguments
+            self, name, stats, is_a_dir, is_link=None, old_item=None):
+        """Create the object for a listed path, preloaded with the given stats
+
+        If is_link is given instead of the stats, the load() of a new object
+        is left to FileSystemObject.load_once().  A file object of a previous
+        listing of the same path is reused if given, and only reloaded if it
+        changed.
+        """
+        basename_is_rel_to = self.path if self.flat else None
+        if is_a_dir:
+            item = self.fm.get_directory(name, preload=stats, path_is_abs=True,
+                                         basename_is_rel_to=basename_is_rel_to)
+            if is_link is None:
+                if stats is None:
+                    item.load_if_outdated()
+                else:
+                    item.load_if_changed(stats)
+            elif not item.loaded:
+                item.is_link = is_link
+            if self.flat:
+                item.relative_path = os.path.relpath(item.path, self.path)
+            else:
+                item.relative_path = item.basename
+            item.relative_path_lower = item.relative_path.lower()
+            if item.vcs and item.vcs.track and not item.vcs.is_root_pointer:
+                item.vcsstatus = \
+                    item.vcs.rootvcs.status_subpath(  # pylint: disable=no-member
+                        os.path.join(self.realpath, item.basename),
+                        is_directory=True,
+                    )
+        elif old_item is not None and old_item.is_file and not (
+                old_item.is_device or old_item.is_fifo or old_item.is_socket):
+            item = old_item
+            if is_link is None:
+                item.load_if_changed(stats)
+            else:
+                # Nothing tells whether it changed, so stat() it again lazily
+                item.loaded = False
+                item.is_link = is_link
+        else:
+            item = File(name, preload=stats, path_is_abs=True,
+                        basename_is_rel_to=basename_is_rel_to)
+            if is_link is None:
+                item.load()
+            else:
+                item.is_link = is_link
+        if not item.is_directory and self.vcs and self.vcs.track:
+            item.vcsstatus = \
+                self.vcs.rootvcs.status_subpath(  # pylint: disable=no-member
+                    os.path.join(self.realpath, item.basename))
+        return item
+
+    def _set_files(self, files, filenames, marked_paths):
+        """Replace the contained files, keeping the marks and the pointer"""
+        self.filenames = filenames
+        self.files_all = files
+
+        self._clear_marked_items()
+        for item in self.files_all:
+            if item.path in marked_paths:
+                item.mark_set(True)
+                self.marked_items.append(item)
+            else:
+                item.mark_set(False)
+
+        self.files_generation += 1
+        self.sort_orders.clear()
+        self.sort()
+
+        if files:
+            if self.pointed_obj is not None:
+                self.sync_index()
+            else:
+                self.move(to=0)
+
+    def _use_listing_cache(self):
+        return self.fm.listing_cache is not None and not self.flat \
+            and not self.settings.lazy_stat and self.settings.cache_directory_listings
+
+    def load_from_listing_cache(self):
+        """Fill in the files from the listing cache, if it's up to date
+
+        Returns True if the cache had a listing of this directory.  It may
+        have outdated stat information, so this is meant to bridge the time
+        until load_bit_by_bit() finished.
+        """
+        if not self._use_listing_cache() or not self.stat or not self.runnable:
+            return False
+        mtime = self.stat.st_mtime
+        listing = self.fm.listing_cache.get(self.path, mtime)
+        if listing is None:
+            return False
+
+        files = [self._make_item(name, stats, is_a_dir) for name, stats, is_a_dir in listing]
+        self.load_content_mtime = mtime
+        self.has_vcschild = any(item.is_directory and item.vcs and item.vcs.track
+                                and item.vcs.is_root_pointer for item in files)
+        self.disk_usage = sum(item.size for item in files if not item.is_directory)
+        if not self.cumulative_size_calculated:
+            self.size = len(files)
+            self.infostring = ('->' if self.is_link else '') + ' %3d' % self.size
+        self.content_loaded = True
+        self._set_files(files, [name for name, _, _ in listing],
+                        set(self.marked_items.paths()))
+        self.last_update_time = time()
+        self.correct_pointer()
+        return True
+
+    def update_entries(self, names):
+        """Bring the entries with the given basenames up to date
+
+        This is used instead of a complete reload when it is known which
+        entries were added, removed or modified, e.g. through inotify.
+        """
+        if self.files_all is None or self.loading or self.flat:
+            self.request_reload()
+            return
+
+        prefix = self.path if self.path == '/' else self.path + '/'
+        items = dict((item.path, item) for item in self.files_all)
+        removed = set()
+        added = []
+        for name in names:
+            path, stats, is_a_dir = stat_entry(prefix + name)
+            item = items.get(path)
+            new_item = None
+            if stats is not None:
+                new_item = self._make_item(path, stats, is_a_dir, old_item=item)
+            if new_item is not item:
+                if item is not None:
+                    removed.add(id(item))
+                if new_item is not None:
+                    added.append(new_item)
+
+        if removed:
+            self.files_all = [item for item in self.files_all if id(item) not in removed]
+        self.files_all.extend(added)
+        if removed or added:
+            self.filenames = [item.path for item in self.files_all]
+            self._gc_marked_items()
+
+        try:
+            self.load_content_mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self.request_reload()
+            return
+        self.disk_usage = None
+        if not self.cumulative_size_calculated:
+            self.size = len(self.files_all)
+            self.infostring = ('->' if self.is_link else '') + ' %3d' % self.size
+        self.files_generation += 1
+        self.sort_orders.clear()
+        self.sort()
+        self.last_update_time = time()
+
+    def _get_changed_subdirectories(self):
+        """Returns the directories of a flat view whose mtime changed
+
+        Returns None if the directory itself is inaccessible.
+        """
+        changed = []
+        for path, mtime in self.flat_mtimes.items():
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    changed.append(path)
+            except OSError:
+                if path == self.path:
+                    return None
+                changed.append(path)
+        return changed
+
+    def update_subdirectories(self, changed):
+        """Bring a flat view up to date after the given directories changed
+
+        Only these directories are listed again, along with the subtrees of
+        directories that appeared in them.  The subtrees of directories that
+        disappeared are dropped.
+        """
+        if self.files_all is None or self.loading:
+            self.request_reload()
+            return
+
+        children = dict((path, set()) for path in changed)
+        for item in self.files_all:
+            parent = item.path.rpartition('/')[0] or '/'
+            if parent in children:
+                children[parent].add(item.path)
+
+        top_depth = self.path.rstrip('/').count('/')
+        removed = set()
+        removed_dirs = []
+        added = []
+        items = dict((item.path, item) for item in self.files_all)
+        for dirpath in sorted(changed):  # parents before their children
+            if dirpath not in self.flat_mtimes:
+                continue  # it went away along with its parent
+            dir_removed, dir_removed_dirs, dir_added = self._rescan_subdirectory(
+                dirpath, children[dirpath], items, top_depth)
+            removed.update(dir_removed)
+            removed_dirs.extend(dir_removed_dirs)
+            added.extend(dir_added)
+
+        if removed:
+            removed_dirs = tuple(removed_dirs)
+            self.files_all = [
+                item for item in self.files_all
+                if item.path not in removed and not item.path.startswith(removed_dirs)]
+        self.files_all.extend(added)
+        self.filenames = [item.path for item in self.files_all]
+        self._gc_marked_items()
+
+        self.load_content_mtime = self.flat_mtimes.get(self.path, -1)
+        self.disk_usage = None
+        if not self.cumulative_size_calculated:
+            self.size = len(self.files_all)
+            self.infostring = ('->' if self.is_link else '') + ' %3d' % self.size
+        self.files_generation += 1
+        self.sort_orders.clear()
+        self.sort()
+        self.last_update_time = time()
+
+    def _rescan_subdirectory(self, dirpath, children, items, top_depth):
+        """List a directory of the flat view again
+
+        children are the paths of its entries shown so far and items maps
+        the paths of all shown entries to their items, it is kept up to date.
+        Returns the paths of the removed items, the paths of the removed
+        directories with a trailing slash and the new items.
+        """
+        try:
+            self.flat_mtimes[dirpath] = os.stat(dirpath).st_mtime
+            entries = scan_entries(dirpath)
+        except OSError:
+            return [], [], []
+        removed, removed_dirs = self._drop_gone_entries(children, items, entries)
+        added = []
+        for path, is_dir, is_link in entries:
+            item = items.get(path)
+            if item is None and is_dir and (self.flat > 0 or not is_link):
+                added.extend(self._list_new_subtree(path, top_depth))
+            new_item = self._make_item(*stat_entry(path), old_item=item)
+            if new_item is not item:
+                if item is not None:
+                    removed.append(path)
+                added.append(new_item)
+        return removed, removed_dirs, added
+
+    def _drop_gone_entries(self, children, items, entries):
+        """Drop the shown children of a directory which are no longer listed
+
+        Also those which turned from a directory into a file or vice versa.
+        Returns their paths and the paths of the directories among them with
+        a trailing slash.
+        """
+        mtimes = self.flat_mtimes
+        listed = dict((entry[0], entry[1]) for entry in entries)
+        removed = []
+        removed_dirs = []
+        for path in children:
+            item = items[path]
+            if listed.get(path, not item.is_directory) == item.is_directory:
+                continue
+            removed.append(path)
+            del items[path]
+            if item.is_directory:
+                removed_dirs.append(path + '/')
+                for subdir in [d for d in mtimes if d == path or d.startswith(path + '/')]:
+                    del mtimes[subdir]
+        return removed, removed_dirs
+
+    def _list_new_subtree(self, path, top_depth):
+        """Return the items below a new directory that the flat view shows"""
+        depth = path.count('/') - top_depth
+        if self.flat != -1 and depth > self.flat:
+            return []
+        return [self._make_item(*stat_entry(subpath))
+                for _, entries in scan_tree(path, self.flat, self.flat_mtimes, depth)
+                for subpath, _, _ in entries]
+
     def unload(self):
         self.loading = False
         self.load_generator = None
 
+    def unload_content(self):
+        """Forget the files, they are listed again when they are needed"""
+        self.unload()
+        self.filenames = None
+        self.files_all = None
+        self.files = None
+        self.cycle_list = None
+        self._filter_cache = None
+        self._path_index = None
+        self._path_index_files = None
+        self.files_generation += 1
+        self.content_loaded = False
+        self.loaded = False
+
     def load_content(self, schedule=None):
         """Loads the contents of the directory.
 
@@ -519,6 +1068,9 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
                 self.load_generator = self.load_bit_by_bit()
 
                 if schedule and self.fm:
+                    if self.files_all is None:
+                        # Show the cached listing while the loader revalidates it
+                        self.load_from_listing_cache()
                     self.fm.loader.add(self)
                 else:
                     for _ in self.load_generator:
@@ -531,62 +1083,83 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
                 self.load_generator = None
 
     def sort(self):
-        """Sort the contained files"""
+        """Sort the contained files
+
+        The order for each sort key is remembered in sort_orders until the
+        content changes, so switching between sort keys only needs to sort
+        once per key.  Reversing and putting directories first are applied
+        to the remembered order.
+        """
         # pylint: disable=comparison-with-callable
         if self.files_all is None:
             return
 
-        try:
-            sort_func = self.sort_dict[self.settings.sort]
-        except KeyError:
-            sort_func = sort_by_basename
+        sort_key = self.settings.sort
+        order_key = (sort_key, self.settings.sort_case_insensitive,
+                     self.settings.sort_unicode)
+        order = self.sort_orders.get(order_key)
+        if order is None:
+            if sort_key not in SORT_KEYS_WITHOUT_STAT:
+                self.load_deferred_stats()
 
-        if self.settings.sort_case_insensitive and \
-                sort_func == sort_by_basename:
-            sort_func = sort_by_basename_icase
+            try:
+                sort_func = self.sort_dict[sort_key]
+            except KeyError:
+                sort_func = sort_by_basename
 
-        if self.settings.sort_case_insensitive and \
-                sort_func == sort_naturally:
-            sort_func = sort_naturally_icase
+            if self.settings.sort_case_insensitive and \
+                    sort_func == sort_by_basename:
+                sort_func = sort_by_basename_icase
 
-        # XXX Does not work with usermade sorting functions :S
-        if self.settings.sort_unicode:
-            if sort_func in (sort_naturally, sort_naturally_icase):
-                sort_func = sort_unicode_wrapper_list(sort_func)
-            elif sort_func in (sort_by_basename, sort_by_basename_icase):
-                sort_func = sort_unicode_wrapper_string(sort_func)
+            if self.settings.sort_case_insensitive and \
+                    sort_func == sort_naturally:
+                sort_func = sort_naturally_icase
 
-        self.files_all.sort(key=sort_func)
+            if sort_func in (sort_naturally, sort_naturally_icase):
+                files = self.files_all
+                keys = natural_sort_keys(
+                    files, sort_func == sort_naturally_icase,
+                    self.settings.sort_unicode and locale_collates())
+                order = [files[i] for i in sorted(range(len(files)), key=keys.__getitem__)]
+            else:
+                # XXX Does not work with usermade sorting functions :S
+                if self.settings.sort_unicode and \
+                        sort_func in (sort_by_basename, sort_by_basename_icase):
+                    sort_func = sort_unicode_wrapper_string(sort_func)
+                order = sorted(self.files_all, key=sort_func)
+            if sort_key != 'random':  # a new shuffle each time
+                self.sort_orders[order_key] = order
 
         if self.settings.sort_reverse:
-            self.files_all.reverse()
+            order = order[::-1]
 
         if self.settings.sort_directories_first:
-            self.files_all.sort(key=sort_by_directory)
+            order = [fobj for fobj in order if fobj.is_directory] \
+                + [fobj for fobj in order if not fobj.is_directory]
+
+        self.files_all[:] = order
+        self.sort_generation += 1
+        self._sorted_settings_generation = self.order_settings_generation
 
         self.refilter()
 
-    def _get_cumulative_size(self):
-        if self.size == 0:
-            return 0
-        cum = 0
-        realpath = os.path.realpath
-        for dirpath, _, filenames in os.walk(self.path, onerror=lambda _: None):
-            for fname in filenames:
-                try:
-                    if dirpath == self.path:
-                        stat = os_stat(realpath(dirpath + "/" + fname))
-                    else:
-                        stat = os_stat(dirpath + "/" + fname)
-                except OSError:
-                    continue
-                cum += stat.st_size
-        return cum
+    def look_up_cumulative_size(self, since=None):
+        """Calculate the cumulative size in the background
+
+        Subtotals cached before the time since, by default now, are not used.
+        """
+        if self.size_loader is None:
+            self.size_loader = CumulativeSizeLoader(
+                self, time() if since is None else since)
+        self.fm.loader.add(self.size_loader)
 
-    def look_up_cumulative_size(self):
+    def set_cumulative_size(self, size, complete=True):
+        """Show the cumulative size, with a "+" if it's still being calculated"""
         self.cumulative_size_calculated = True
-        self.size = self._get_cumulative_size()
-        self.infostring = ('-> ' if self.is_link else ' ') + human_readable(self.size, use_opt=True)
+        self.size = size
+        self.infostring = ('-> ' if self.is_link else ' ') \
+            + human_readable(size, use_opt=True) + ('' if complete else '+')
+        self.fm.ui.redraw_main_column()
 
     @lazy_property
     def size(self):  # pylint: disable=method-hidden
@@ -622,11 +1195,20 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
         return self.runnable
 
     def sort_if_outdated(self):
-        """Sort the containing files if they are outdated"""
+        """Sort or filter the containing files if they are outdated"""
         if self.order_outdated:
             self.order_outdated = False
+            self.sort_orders.clear()
             self.sort()
             return True
+        if self.files_all is None:
+            return False
+        if self._sorted_settings_generation != self.order_settings_generation:
+            self.sort()
+            return True
+        if self._filtered_settings_generation != self.filter_settings_generation:
+            self.refilter()
+            return True
         return False
 
     def move_to_obj(self, arg, attr=None):
@@ -635,10 +1217,29 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
         except AttributeError:
             pass
         self.load_content_once(schedule=False)
-        if self.empty():
+        if self.empty() or not arg:
             return
 
-        Accumulator.move_to_obj(self, arg, attr='path')
+        index = self.index_of(arg)
+        self.move(to=self.pointer if index is None else index)
+
+    def index_of(self, path):
+        """The index of the file with the given path in files, or None
+
+        The index of all files is built once after each refilter.
+        """
+        files = self.files
+        if not files:
+            return None
+        if self._path_index is None or self._path_index_files is not files:
+            self._path_index = dict((fobj.path, i) for i, fobj in enumerate(files))
+            self._path_index_files = files
+        index = self._path_index.get(path)
+        if index is not None and (index >= len(files) or files[index].path != path):
+            # files was changed in place
+            self._path_index = None
+            return self.index_of(path)
+        return index
 
     def search_fnc(self, fnc, offset=1, forward=True):
         length = len(self)
@@ -690,18 +1291,18 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
     def load_content_if_outdated(self, *a, **k):
         """Load the contents of the directory if outdated"""
 
-        if self.load_content_once(*a, **k):
-            return True
-
-        if self.files_all is None or self.content_outdated:
+        if not self.content_loaded or self.files_all is None or self.content_outdated:
             self.load_content(*a, **k)
             return True
 
+        if self.fm.watcher is not None and self.path in self.fm.watcher:
+            return False  # the watcher takes care of it
+
+        if self.flat:
+            return self._load_flat_content_if_outdated(*a, **k)
+
         try:
-            if self.flat:
-                real_mtime = mtimelevel(self.path, self.flat)
-            else:
-                real_mtime = os.stat(self.path).st_mtime
+            real_mtime = os.stat(self.path).st_mtime
         except OSError:
             real_mtime = None
             return False
@@ -715,6 +1316,17 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
             return True
         return False
 
+    def _load_flat_content_if_outdated(self, *a, **k):
+        """List the changed directories of a flat view again"""
+        if self.flat_mtimes is None:
+            self.load_content(*a, **k)
+            return True
+        changed = self._get_changed_subdirectories()
+        if not changed:  # None if the directory itself is gone
+            return False
+        self.update_subdirectories(changed)
+        return True
+
     def get_description(self):
         return "Loading " + str(self)
 
@@ -772,3 +1384,9 @@ class Directory(  # pylint: disable=too-many-instance-attributes,too-many-public
 
     def __hash__(self):
         return hash(self.path)
+
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
@@ -5,6 +5,7 @@ from __future__ import (absolute_import, division, print_function)
 
 import re
 from grp import getgrgid
+from itertools import count
 from os import lstat, stat
 from os.path import abspath, basename, dirname, realpath, relpath, splitext, expanduser
 from pwd import getpwuid
@@ -53,15 +54,32 @@ def safe_path(path):
     return path.translate(_SAFE_STRING_TABLE)
 
 
+# The flags set by FileSystemObject.set_mimetype(), in the order of mimetype_tuple
+MIMETYPE_FLAGS = ('video', 'audio', 'image', 'media', 'ebooks', 'www', 'document',
+                  'mimetext', 'special', 'container')
+# Every distinct mimetype_tuple once, to share them between the objects
+_MIMETYPE_TUPLES = {}
+
+# Identifies an object and how it was loaded in the keys of rendered lines
+_DISPLAY_GENERATIONS = count()
+
+
+def _mimetype_flag(flag):
+    return property(lambda self: flag in self.mimetype_tuple)
+
+
 class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many-public-methods
         FileManagerAware, SettingsAware):
-    basename = None
-    relative_path = None
+    # The attributes every loaded object has live in slots instead of the
+    # __dict__, which only holds the less common and the lazy attributes.
+    __slots__ = (
+        'original_path', 'path', 'basename', 'relative_path', 'preload',
+        'display_generation', 'permissions', 'stat', 'is_link', 'exists',
+        'accessible', 'loaded', 'marked', 'last_load_time', '_mimetype',
+        '_mimetype_tuple',
+    )
+
     infostring = None
-    original_path = None
-    path = None
-    permissions = None
-    stat = None
 
     content_loaded = False
     force_load = False
@@ -70,30 +88,14 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
     is_directory = False
     is_file = False
     is_fifo = False
-    is_link = False
     is_socket = False
 
-    accessible = False
-    exists = False  # "exists" currently means "link_target_exists"
-    loaded = False
-    marked = False
     runnable = False
     stopped = False
     tagged = False
 
-    audio = False
-    container = False
-    document = False
-    image = False
-    media = False
-    video = False
-    mimetext = False
-    special = False
-
     size = 0
 
-    last_load_time = -1
-
     vcsstatus = None
     vcsremotestatus = None
 
@@ -105,6 +107,15 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
     )
 
     def __init__(self, path, preload=None, path_is_abs=False, basename_is_rel_to=None):
+        self.permissions = None
+        self.stat = None
+        self.is_link = False
+        self.exists = False  # "exists" currently means "link_target_exists"
+        self.accessible = False
+        self.loaded = False
+        self.marked = False
+        self.last_load_time = -1
+
         self.original_path = path
         path = expanduser(path)
         if not path_is_abs:
@@ -116,7 +127,7 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
         else:
             self.relative_path = relpath(path, basename_is_rel_to)
         self.preload = preload
-        self.display_data = {}
+        self.display_generation = next(_DISPLAY_GENERATIONS)
 
     def __repr__(self):
         return "<{0} {1}>".format(self.__class__.__name__, self.path)
@@ -206,9 +217,16 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
         except KeyError:
             return str(self.stat.st_gid)
 
-    for attr in ('video', 'audio', 'image', 'media', 'document', 'mimetext', 'special', 'container'):
-        exec(  # pylint: disable=exec-used
-            "%s = lazy_property(lambda self: self.set_mimetype() or self.%s)" % (attr, attr))
+    video = _mimetype_flag('video')
+    audio = _mimetype_flag('audio')
+    image = _mimetype_flag('image')
+    media = _mimetype_flag('media')
+    ebooks = _mimetype_flag('ebooks')
+    www = _mimetype_flag('www')
+    document = _mimetype_flag('document')
+    mimetext = _mimetype_flag('mimetext')
+    special = _mimetype_flag('special')
+    container = _mimetype_flag('container')
 
     def __str__(self):
         """returns a string containing the absolute path"""
@@ -217,7 +235,7 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
     def use(self):
         """Used in garbage-collecting.  Override in Directory"""
 
-    def look_up_cumulative_size(self):
+    def look_up_cumulative_size(self, since=None):
         pass  # normal files have no cumulative size
 
     def set_mimetype(self):
@@ -225,30 +243,30 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
         bname = self.basename
         if self.extension == 'part':
             bname = bname[0:-5]
+        mimetype = self.fm.mimetypes.guess_type(bname, False)[0] or ''
+        extension = self.extension
+
+        video = mimetype.startswith('video')
+        image = mimetype.startswith('image')
+        audio = mimetype.startswith('audio')
+        flags = (
+            video,
+            audio,
+            image,
+            video or image or audio,
+            extension in DOCUMENT_EBOOKS,
+            extension in DOCUMENT_WWW,
+            extension in DOCUMENT_EXTENSIONS,
+            mimetype.startswith('mimetext'),
+            self.basename.lower() in DOCUMENT_BASENAMES,
+            extension in CONTAINER_EXTENSIONS,
+        )
+        mimetype_tuple = tuple(key for key, flag in zip(MIMETYPE_FLAGS, flags) if flag)
+
+        # The slots stay unset until the mimetype is first needed
         # pylint: disable=attribute-defined-outside-init
-        self._mimetype = self.fm.mimetypes.guess_type(bname, False)[0]
-        if self._mimetype is None:
-            self._mimetype = ''
-        # pylint: enable=attribute-defined-outside-init
-
-        self.video = self._mimetype.startswith('video')
-        self.image = self._mimetype.startswith('image')
-        self.audio = self._mimetype.startswith('audio')
-        self.media = self.video or self.image or self.audio
-        self.document  = self.extension in DOCUMENT_EXTENSIONS
-        self.mimetext  = self._mimetype.startswith('mimetext')
-        self.special   = self.basename.lower() in DOCUMENT_BASENAMES
-        self.container = self.extension in CONTAINER_EXTENSIONS
-        self.ebooks    = self.extension in DOCUMENT_EBOOKS
-        self.www       = self.extension in DOCUMENT_WWW
-
-        # pylint: disable=attribute-defined-outside-init
-        keys = ('video', 'audio', 'image', 'media', 'ebooks', 'www', 'document', 'mimetext', 'special', 'container')
-        self._mimetype_tuple = tuple(key for key in keys if getattr(self, key))
-
-        if self._mimetype == '':
-            self._mimetype = None
-        # pylint: enable=attribute-defined-outside-init
+        self._mimetype = mimetype or None
+        self._mimetype_tuple = _MIMETYPE_TUPLES.setdefault(mimetype_tuple, mimetype_tuple)
 
     @property
     def mimetype(self):
@@ -294,7 +312,7 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
         if self.settings.freeze_files:
             return
 
-        self.display_data = {}
+        self.display_generation = next(_DISPLAY_GENERATIONS)
         self.fm.update_preview(self.path)
 
         # Get the stat object, either from preload or from [l]stat
@@ -374,6 +392,17 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
         self.permissions = ''.join(perms)
         return self.permissions
 
+    def load_once(self):
+        """Calls load() if it wasn't called yet
+
+        Directories listed with the setting lazy_stat postpone the load() of
+        their entries until the stat information is actually needed.
+        """
+        if not self.loaded:
+            self.load()
+            return True
+        return False
+
     def load_if_outdated(self):
         """Calls load() if the currently cached information is outdated"""
         if not self.loaded:
@@ -388,5 +417,20 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
             return True
         return False
 
+    def load_if_changed(self, stats):
+        """Calls load() with the given stats if the cached ones are outdated
+
+        Unlike load_if_outdated(), this compares with (stat, lstat) pairs
+        that were already obtained, e.g. while listing the parent directory.
+        """
+        # A symlink has to be loaded again to see where it points to now
+        plain_file = self.loaded and not self.is_link \
+            and stats is not None and stats[0] is stats[1]
+        if plain_file and self.stat and self.stat.st_ctime == stats[0].st_ctime:
+            return False
+        self.preload = stats
+        self.load()
+        return True
+
     def set_linemode(self, mode):
         self.linemode = mode
@@ -0,0 +1,75 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""The marked files of a directory, in the order they were marked.
+
+>>> from ranger.ext.openstruct import OpenStruct
+>>> first, second = OpenStruct(path='/a'), OpenStruct(path='/b')
+>>> items = MarkedItems()
+>>> items.append(second)
+>>> items.append(first)
+>>> items.append(second)
+>>> [item.path for item in items]
+['/b', '/a']
+>>> first in items, OpenStruct(path='/a') in items
+(True, False)
+>>> items.discard(second)
+>>> len(items), '/a' in items.paths()
+(1, True)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from collections import OrderedDict
+
+
+class MarkedItems(object):
+    """An ordered set of file objects, keyed by their path
+
+    Membership tests, adding and removing are O(1).  Iterating goes over a
+    snapshot, so items may be unmarked while iterating.
+    """
+
+    def __init__(self, items=()):
+        self._items = OrderedDict()
+        for item in items:
+            self.append(item)
+
+    def append(self, item):
+        if item.path not in self._items:
+            self._items[item.path] = item
+
+    def discard(self, item):
+        if self._items.get(item.path) is item:
+            del self._items[item.path]
+
+    def discard_path(self, path):
+        self._items.pop(path, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def copy(self):
+        return MarkedItems(self._items.values())
+
+    def paths(self):
+        return self._items.keys()
+
+    def __contains__(self, item):
+        return self._items.get(getattr(item, 'path', None)) is item
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __nonzero__(self):
+        return bool(self._items)
+    __bool__ = __nonzero__
+
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
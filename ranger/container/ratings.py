@@ -0,0 +1,154 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""The star ratings of files.
+
+The ratings are kept in a dict from path to stars.  On disk, they are a
+journal with one "<stars> <path>" line per change, the paths rot13-encoded
+like before.  A change appends a single line, a later line overrides an
+earlier one and 0 stars remove a rating.  The journal is compacted once it
+holds many more lines than ratings.
+
+>>> ratings = Ratings(None)
+>>> ratings.update('/music/a.ogg', 3)
+3
+>>> ratings.update('/music/a.ogg', 9)
+7
+>>> ratings.get('/music/a.ogg'), ratings.get('/music/b.ogg')
+(7, 0)
+>>> ratings.rated_below('/music'), ratings.rated_below('/mus')
+(True, False)
+>>> ratings.update('/music/a.ogg', -7)
+0
+>>> '/music/a.ogg' in ratings
+False
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import codecs
+import os
+from bisect import bisect_left
+from io import open
+
+from ranger.core.shared import FileManagerAware
+
+MAX_STARS = 7
+
+
+def _encode(path):
+    return codecs.encode(path, 'rot13')
+
+
+_decode = _encode  # pylint: disable=invalid-name
+
+
+class Ratings(FileManagerAware):
+    """The ratings of files, stored in the given file (None to not store them)"""
+
+    # Compact the journal when it has this many more lines than ratings
+    compact_threshold = 200
+
+    def __init__(self, filename):
+        self._filename = filename
+        self.ratings = {}
+        # Incremented whenever the ratings change
+        self.generation = 0
+        self._sorted_paths = None
+        self._journal_lines = 0
+        self.load()
+
+    def __contains__(self, path):
+        return path in self.ratings
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def get(self, path):
+        return self.ratings.get(path, 0)
+
+    def load(self):
+        self.ratings = {}
+        self._journal_lines = 0
+        if self._filename is None:
+            return
+        try:
+            with open(self._filename, 'r', encoding='utf-8', errors='surrogateescape') as fobj:
+                for line in fobj:
+                    stars, _, path = line.rstrip('\n').partition(' ')
+                    if not path or not stars.isdigit():
+                        continue
+                    self._journal_lines += 1
+                    self._set(_decode(path), int(stars))
+        except (OSError, IOError) as err:
+            if os.path.exists(self._filename):
+                self.fm.notify(err, bad=True)
+        self._changed()
+
+    def update(self, path, offset):
+        """Add offset to the stars of path and return the new number of stars"""
+        stars = max(0, min(MAX_STARS, self.get(path) + offset))
+        if stars != self.get(path):
+            self._set(path, stars)
+            self._changed()
+            self._write(((path, stars),), 'a')
+        return stars
+
+    def import_ratings(self, ratings):
+        """Add ratings from an iterable of (path, stars) tuples"""
+        for path, stars in ratings:
+            self._set(path, max(0, min(MAX_STARS, stars)))
+        self._changed()
+        self.compact()
+
+    def rated_below(self, path):
+        """Whether any file inside the directory at path is rated"""
+        if self._sorted_paths is None:
+            self._sorted_paths = sorted(self.ratings)
+        prefix = path.rstrip(os.sep) + os.sep
+        i = bisect_left(self._sorted_paths, prefix)
+        return i < len(self._sorted_paths) and self._sorted_paths[i].startswith(prefix)
+
+    def compact(self, force=False):
+        """Rewrite the journal with one line per rating of an existing file"""
+        if not force and self._journal_lines <= len(self.ratings) + self.compact_threshold:
+            return
+        for path in [path for path in self.ratings if not os.path.exists(path)]:
+            del self.ratings[path]
+        self._changed()
+        self._journal_lines = 0
+        self._write(sorted(self.ratings.items()), 'w')
+
+    def _set(self, path, stars):
+        if stars > 0:
+            self.ratings[path] = stars
+        else:
+            self.ratings.pop(path, None)
+
+    def _changed(self):
+        self.generation += 1
+        self._sorted_paths = None
+
+    def _write(self, ratings, mode):
+        if self._filename is None:
+            return
+        if mode == 'w':
+            # Replace the file at once, a crash must not lose the ratings
+            filename = self._filename + '.new'
+        else:
+            filename = self._filename
+        try:
+            with open(filename, mode, encoding='utf-8', errors='surrogateescape') as fobj:
+                for path, stars in ratings:
+                    fobj.write('{0} {1}\n'.format(stars, _encode(path)))
+                    self._journal_lines += 1
+            if filename != self._filename:
+                os.rename(filename, self._filename)
+        except (OSError, IOError) as err:
+            self.fm.notify(err, bad=True)
+
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
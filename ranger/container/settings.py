@@ -27,6 +27,7 @@ ALLOWED_SETTINGS = {
     'autoupdate_cumulative_size': bool,
     'bidi_support': bool,
     'binary_size_prefix': bool,
+    'cache_directory_listings': bool,
     'cd_bookmarks': bool,
     'cd_tab_case': str,
     'cd_tab_fuzzy': bool,
@@ -62,7 +63,10 @@ ALLOWED_SETTINGS = {
     'idle_delay': int,
     'iterm2_font_width': int,
     'iterm2_font_height': int,
+    'lazy_stat': bool,
     'line_numbers': str,
+    'max_cached_entries': (int, type(None)),
+    'max_coalesced_keys': int,
     'max_console_history_size': (int, type(None)),
     'max_history_size': (int, type(None)),
     'metadata_deep_search': bool,
@@ -93,6 +97,7 @@ ALLOWED_SETTINGS = {
     'sort_reverse': bool,
     'sort': str,
     'sort_unicode': bool,
+    'stat_pool_size': int,
     'status_bar_on_top': bool,
     'tilde_in_titlebar': bool,
     'unicode_ellipsis': bool,
@@ -108,6 +113,7 @@ ALLOWED_SETTINGS = {
     'viewmode': str,
     'w3m_delay': float,
     'w3m_offset': int,
+    'watch_directories': bool,
     'wrap_plaintext_previews': bool,
     'wrap_scroll': bool,
     'xterm_alt_key': bool,
@@ -134,6 +140,9 @@ ALLOWED_VALUES = {
     'viewmode': ['miller', 'multipane'],
 }
 
+# How many resolved (setting, path) pairs Settings.get() remembers
+RESOLVED_CACHE_MAX = 10000
+
 DEFAULT_VALUES = {
     bool: False,
     type(None): None,
@@ -153,6 +162,9 @@ class Settings(SignalDispatcher, FileManagerAware):
         self.__dict__['_localregexes'] = {}
         self.__dict__['_tagsettings'] = {}
         self.__dict__['_settings'] = {}
+        # (name, path, tagged) -> the dict which holds the value for the path
+        self.__dict__['_resolved'] = {}
+        self.__dict__['_resolved_tags_generation'] = None
         for name in ALLOWED_SETTINGS:
             self.signal_bind('setopt.' + name, self._sanitize,
                              priority=SIGNAL_PRIORITY_SANITIZE)
@@ -227,6 +239,13 @@ class Settings(SignalDispatcher, FileManagerAware):
 
     def get(self, name, path=None):
         assert name in ALLOWED_SETTINGS, "No such setting: {0}!".format(name)
+        if not self._localregexes and not self._tagsettings:
+            # Nothing is set for a path or tag, the global value applies
+            try:
+                return self._settings[name]
+            except KeyError:
+                pass
+
         if path:
             localpath = path
         else:
@@ -235,24 +254,47 @@ class Settings(SignalDispatcher, FileManagerAware):
             except AttributeError:
                 localpath = None
 
+        tagged = bool(self._tagsettings and path)
+        if tagged and self.fm.tags.generation != self.__dict__['_resolved_tags_generation']:
+            self._resolved.clear()
+            self.__dict__['_resolved_tags_generation'] = self.fm.tags.generation
+
+        key = (name, localpath, tagged)
+        try:
+            return self._resolved[key][name]
+        except KeyError:
+            pass
+        source = self._resolve(name, localpath, path if tagged else None)
+        if len(self._resolved) >= RESOLVED_CACHE_MAX:
+            self._resolved.clear()
+        self._resolved[key] = source
+        return source[name]
+
+    def _resolve(self, name, localpath, path):
+        """Find the dict which holds the value of a setting for a path
+
+        The dict is returned rather than the value, so the result stays
+        valid when the value changes, until a setting for a path or a tag
+        is added.
+        """
         if localpath:
             for pattern, regex in self._localregexes.items():
                 if name in self._localsettings[pattern] and\
                         regex.search(localpath):
-                    return self._localsettings[pattern][name]
+                    return self._localsettings[pattern]
 
-        if self._tagsettings and path:
+        if path:
             realpath = os.path.realpath(path)
             if realpath in self.fm.tags:
                 tag = self.fm.tags.marker(realpath)
                 if tag in self._tagsettings and name in self._tagsettings[tag]:
-                    return self._tagsettings[tag][name]
+                    return self._tagsettings[tag]
 
         if name not in self._settings:
             value = self._get_default(name)
             self._raw_set(name, value)
             setattr(self, name, value)
-        return self._settings[name]
+        return self._settings
 
     def __setattr__(self, name, value):
         if name.startswith('_'):
@@ -297,6 +339,8 @@ class Settings(SignalDispatcher, FileManagerAware):
     __setitem__ = __setattr__
 
     def _raw_set(self, name, value, path=None, tags=None):
+        if path or tags:
+            self._resolved.clear()
         if path:
             if path not in self._localsettings:
                 try:
@@ -3,19 +3,41 @@
 
 # TODO: add a __getitem__ method to get the tag of a file
 
+"""The tagged files.
+
+The file is a journal.  Each line tags a path, with "<tag>:<path>" or just
+the path for the default tag, and " :<path>" removes the tag of a path.
+Changes are appended to it and later lines override earlier ones.  Older
+versions of ranger ignore the removal lines.  The file is rewritten with
+one line per tag once the journal grew to twice the number of tags.
+"""
+
 from __future__ import (absolute_import, division, print_function)
 
+import os
 import string
+import zlib
+from bisect import bisect_left, insort
+from contextlib import contextmanager
 from io import open
-from os.path import exists, abspath, realpath, expanduser, sep
+from os.path import abspath, realpath, expanduser, sep
 
 from ranger.core.shared import FileManagerAware
 
 ALLOWED_KEYS = string.ascii_letters + string.digits + string.punctuation
 
+# The prefix of a line which removes the tag of a path
+REMOVED = ' :'
+
 
 class Tags(FileManagerAware):
     default_tag = '*'
+    # Incremented whenever the tags may have changed
+    generation = 0
+    # The changes of the running batch(), None outside of one
+    _pending = None
+    # The tagged paths in sorted order, built by the first paths_under()
+    _sorted_paths = None
 
     def __init__(self, filename):
 
@@ -25,30 +47,46 @@ class Tags(FileManagerAware):
         # line with normpath's.
         self._filename = realpath(abspath(expanduser(filename)))
 
+        self.tags = {}
+        # (st_ino, size, st_mtime, crc32) of the file as far as it was read
+        self._file_state = None
+        self._file_lines = 0
         self.sync()
 
     def __contains__(self, item):
         return item in self.tags
 
+    @contextmanager
+    def batch(self):
+        """Write the changes made inside the with-block at once"""
+        if self._pending is not None:
+            yield
+            return
+        self._pending = []
+        try:
+            yield
+        finally:
+            changes, self._pending = self._pending, None
+            self._write_changes(changes)
+
     def add(self, *items, **others):
         if len(items) == 0:
             return
         tag = others.get('tag', self.default_tag)
         self.sync()
         for item in items:
-            self.tags[item] = tag
-        self.dump()
+            self._set(item, tag)
+        self._write_changes([(item, tag) for item in items])
 
     def remove(self, *items):
         if len(items) == 0:
             return
         self.sync()
+        changes = []
         for item in items:
-            try:
-                del self.tags[item]
-            except KeyError:
-                pass
-        self.dump()
+            if self._set(item, None):
+                changes.append((item, None))
+        self._write_changes(changes)
 
     def toggle(self, *items, **others):
         if len(items) == 0:
@@ -58,39 +96,151 @@ class Tags(FileManagerAware):
         if tag not in ALLOWED_KEYS:
             return
         self.sync()
+        changes = []
         for item in items:
-            try:
-                if item in self and tag in (self.tags[item], self.default_tag):
-                    del self.tags[item]
-                else:
-                    self.tags[item] = tag
-            except KeyError:
-                pass
-        self.dump()
+            if item in self and tag in (self.tags[item], self.default_tag):
+                self._set(item, None)
+                changes.append((item, None))
+            else:
+                self._set(item, tag)
+                changes.append((item, tag))
+        self._write_changes(changes)
 
     def marker(self, item):
         if item in self.tags:
             return self.tags[item]
         return self.default_tag
 
+    def paths_under(self, path):
+        """The tagged paths which are path or inside of it, in sorted order
+
+        Takes O(log n) plus the number of found paths.
+        """
+        if self._sorted_paths is None:
+            self._sorted_paths = sorted(self.tags)
+        paths = self._sorted_paths
+        result = [path] if path in self.tags else []
+        prefix = path.rstrip(sep) + sep
+        end = bisect_left(paths, prefix[:-1] + chr(ord(sep) + 1))
+        result.extend(paths[bisect_left(paths, prefix, hi=end):end])
+        return result
+
+    def _set(self, path, tag):
+        """Tag the path, or untag it if tag is None
+
+        Returns whether the path was tagged before or is now.
+        """
+        paths = self._sorted_paths
+        if tag is None:
+            if self.tags.pop(path, None) is None:
+                return False
+            if paths is not None:
+                del paths[bisect_left(paths, path)]
+        else:
+            if paths is not None and path not in self.tags:
+                insort(paths, path)
+            self.tags[path] = tag
+        return True
+
     def sync(self):
+        """Read the changes made to the file by others, if there are any"""
         try:
-            with open(
-                self._filename, "r", encoding="utf-8", errors="replace"
-            ) as fobj:
-                self.tags = self._parse(fobj)
-        except (OSError, IOError) as err:
-            if exists(self._filename):
-                self.fm.notify(err, bad=True)
-            else:
+            stat = os.stat(self._filename)
+        except OSError:
+            if self.tags or self._file_state is not None:
                 self.tags = {}
+                self._sorted_paths = None
+                self._file_state = None
+                self._file_lines = 0
+                self.generation += 1
+            return
+        old_state = self._file_state
+        if old_state is not None and old_state[0] == stat.st_ino \
+                and old_state[1] == stat.st_size and old_state[2] == stat.st_mtime:
+            return
+
+        try:
+            with open(self._filename, 'rb') as fobj:
+                data = fobj.read()
+        except (OSError, IOError) as err:
+            self.fm.notify(err, bad=True)
+            return
+        # Leave a line which is still being written for the next time
+        data = data[:data.rfind(b'\n') + 1]
+        offset = 0
+        if old_state is not None and old_state[0] == stat.st_ino \
+                and old_state[1] <= len(data) \
+                and zlib.crc32(data[:old_state[1]]) == old_state[3]:
+            # Only appended to, parse the new lines.  A file rewritten in
+            # place keeps its inode, so the old part is compared too.
+            offset = old_state[1]
+        lines = data[offset:].decode('utf-8', 'replace').splitlines()
+
+        if offset == 0:
+            self.tags = {}
+            self._sorted_paths = None
+            self._file_lines = 0
+        for path, tag in self._parse(lines):
+            self._set(path, tag)
+        self._file_lines += len(lines)
+        self._file_state = (stat.st_ino, len(data), stat.st_mtime, zlib.crc32(data))
+        self.generation += 1
 
     def dump(self):
+        """Rewrite the file with one line per tag"""
+        self.generation += 1
+        filename = self._filename + '.new'
         try:
-            with open(self._filename, 'w', encoding="utf-8") as fobj:
+            with open(filename, 'w', encoding="utf-8") as fobj:
                 self._compile(fobj)
+            os.rename(filename, self._filename)
+            stat = os.stat(self._filename)
+            with open(self._filename, 'rb') as fobj:
+                data = fobj.read()
+        except (OSError, IOError) as err:
+            self.fm.notify(err, bad=True)
+            return
+        self._file_state = (stat.st_ino, len(data), stat.st_mtime, zlib.crc32(data))
+        self._file_lines = len(self.tags)
+
+    def _write_changes(self, changes):
+        """Append the (path, tag) changes to the file, tag None removes it"""
+        self.generation += 1
+        if self._pending is not None:
+            self._pending.extend(changes)
+            return
+        if not changes:
+            return
+        if self._file_lines + len(changes) > 2 * len(self.tags):
+            self.dump()
+            return
+
+        lines = []
+        for path, tag in changes:
+            if tag is None:
+                lines.append(REMOVED + path + '\n')
+            elif tag == self.default_tag:
+                # COMPAT: keep the old format if the default tag is used
+                lines.append(path + '\n')
+            elif tag in ALLOWED_KEYS:
+                lines.append('{0}:{1}\n'.format(tag, path))
+        try:
+            with open(self._filename, 'a', encoding="utf-8") as fobj:
+                fobj.write(''.join(lines))
+            stat = os.stat(self._filename)
         except OSError as err:
             self.fm.notify(err, bad=True)
+            return
+        self._file_lines += len(lines)
+        state = self._file_state
+        written = ''.join(lines).encode('utf-8')
+        if state is not None and state[0] == stat.st_ino \
+                and state[1] + len(written) == stat.st_size:
+            self._file_state = (stat.st_ino, stat.st_size, stat.st_mtime,
+                                zlib.crc32(written, state[3]))
+        # Otherwise someone else wrote to the file too.  The next sync()
+        # reads everything after the old state again, including these lines,
+        # which does no harm.
 
     def _compile(self, fobj):
         for path, tag in self.tags.items():
@@ -100,41 +250,32 @@ class Tags(FileManagerAware):
             elif tag in ALLOWED_KEYS:
                 fobj.write('{0}:{1}\n'.format(tag, path))
 
-    def _parse(self, fobj):
-        result = {}
-        for line in fobj:
+    def _parse(self, lines):
+        """Yield (path, tag) for each line, the tag is None for removals"""
+        for line in lines:
             line = line.rstrip('\n')
-            if len(line) > 2 and line[1] == ':':
+            if line.startswith(REMOVED):
+                yield line[len(REMOVED):], None
+            elif len(line) > 2 and line[1] == ':':
                 tag, path = line[0], line[2:]
                 if tag in ALLOWED_KEYS:
-                    result[path] = tag
-            else:
-                result[line] = self.default_tag
-
-        return result
+                    yield path, tag
+            elif line:
+                yield line, self.default_tag
 
     def update_path(self, path_old, path_new):
         self.sync()
-        changed = False
-        # Iterate over a snapshot of the items because the loop body mutates
-        # ``self.tags`` (deletes the old key, inserts the new one).  Iterating
-        # ``self.tags.items()`` directly raises
-        # ``RuntimeError: dictionary keys changed during iteration`` on
-        # Python 3, which would abort the update before ``dump()`` runs and
-        # leave the renamed path silently un-tagged on disk.
-        for path, tag in list(self.tags.items()):
-            pnew = None
-            if path == path_old:
-                pnew = path_new
-            elif path.startswith(path_old + sep):
-                pnew = path_new + path[len(path_old):]
-            if pnew:
-                # pylint: disable=unnecessary-dict-index-lookup
-                del self.tags[path]
-                self.tags[pnew] = tag
-                changed = True
-        if changed:
-            self.dump()
+        moved = [(path, self.tags[path]) for path in self.paths_under(path_old)]
+        changes = []
+        for path, _ in moved:
+            self._set(path, None)
+            changes.append((path, None))
+        for path, tag in moved:
+            pnew = path_new + path[len(path_old):]
+            self._set(pnew, tag)
+            changes.append((pnew, tag))
+        if changes:
+            self._write_changes(changes)
 
     def __nonzero__(self):
         return True
@@ -171,8 +312,11 @@ class TagsDummy(Tags):
     def dump(self):
         pass
 
+    def _write_changes(self, changes):
+        pass
+
     def _compile(self, fobj):
         pass
 
-    def _parse(self, fobj):
+    def _parse(self, lines):
         pass
@@ -19,11 +19,13 @@ from logging import getLogger
 from os import link, symlink, listdir, stat
 from os.path import join, isdir, realpath, exists
 from stat import S_IEXEC
+from time import time
 
 import ranger
 from ranger import PY3
 from ranger.container.directory import Directory
 from ranger.container.file import File
+from ranger.container.ratings import Ratings
 from ranger.container.settings import ALLOWED_SETTINGS, ALLOWED_VALUES
 from ranger.core.loader import CommandLoader, CopyLoader
 from ranger.core.shared import FileManagerAware, SettingsAware
@@ -230,24 +232,10 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
         tabs_path['tab1'] = self.fm.thistab.path
         tabs_path['tab2'] = self.fm.get_macros()['D']
 
-        rating_info = []
-        for entry in self.rating_info:
-            if entry['star'] <= 0:
-                continue
-            if not os.path.exists(entry['path']):
-                continue
-
-            path_enc = ''
-            for c in entry['path']:
-                path_enc += chr(ord(c) + 13)
-            d = {}
-            d['path'] = path_enc
-            d['star']=entry['star']
-            rating_info.append(d)
+        self.ratings.compact()
 
         rangerinfo = {}
         rangerinfo["tabs"] = tabs_path
-        rangerinfo["ratings"] = rating_info
 
         filepath = self.confpath('rangerinfo.json')
         with open(filepath, "w", encoding="utf-8") as fobj:
@@ -256,13 +244,17 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
     def load_ranger_info(self):
         import json
 
+        ratings_path = None
+        if not ranger.args.clean:
+            ratings_path = self.datapath('ratings')
+            self.ratings = Ratings(ratings_path)
+
         filepath = self.confpath('rangerinfo.json')
         if not exists(filepath):
             self.notify("%s not exist!" % filepath)
             return
 
         tabs_path = {}
-        rating_info = []
         with open(filepath, "r", encoding="utf-8", errors="surrogateescape") as fobj:
             try:
                 entries = json.load(fobj)
@@ -270,11 +262,9 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
                 self.notify("failed to load %s!" % filepath)
                 return
 
-            try:
-                rating_info = entries["ratings"]
-            except KeyError:
-                self.notify("failed to load rating info!")
-                pass
+            # Only files written before the ratings got their own file
+            # have them
+            rating_info = entries.get("ratings")
 
             try:
                 tabs_path = entries["tabs"]
@@ -287,34 +277,17 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
         if tabs_path:
             self.tabs_path = tabs_path;
 
-        if rating_info:
-            for entry in rating_info:
-                path_dec = ''
-                for c in entry["path"]:
-                    path_dec += chr(ord(c) - 13)
-                d = {}
-                d["path"] = path_dec
-                d["star"] = entry["star"]
-                self.rating_info.append(d)
+        if rating_info and ratings_path and not exists(ratings_path):
+            # Ratings used to be stored here, with the characters of the
+            # paths shifted by 13
+            self.ratings.import_ratings(
+                (''.join(chr(ord(c) - 13) for c in entry["path"]), entry["star"])
+                for entry in rating_info)
 
     def update_rating_info(self, path, stars_offset):
         if not path or not stars_offset:
             return
-
-        for entry in self.rating_info:
-            if entry['path'] == path:
-                entry['star'] += stars_offset
-                if entry['star'] <= 0:
-                    self.rating_info.remove(entry)
-                elif entry['star'] > 7:
-                    entry['star'] = 7
-                return
-
-        if stars_offset > 0:
-            d = {}
-            d['star'] = stars_offset if stars_offset <= 7 else 7
-            d['path'] = path
-            self.rating_info.append(d)
+        self.ratings.update(path, stars_offset)
 
     def set_rating_stars(self, mode=1, narg=None):
         offset = narg or 1
@@ -322,7 +295,7 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
         #self.notify("%s, %s" % (mode, narg))
 
         for fobj in self.thistab.get_selection():
-            if fobj in self.thisdir.files:
+            if self.thisdir.index_of(fobj.path) is not None:
                 self.update_rating_info(fobj.path, offset)
 
         self.reload_cwd()
@@ -330,15 +303,10 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
     def has_rating_stars(self, fobj):
         if not fobj:
             return False
-
-        for entry in self.rating_info:
-            try:
-                if entry['path'] == fobj.path:
-                    return True
-            except:
-                pass
-
-        return False
+        if fobj.path in self.ratings:
+            return True
+        # A directory which contains rated files leads to them
+        return fobj.is_directory and self.ratings.rated_below(fobj.path)
     #add by sim1: ----------------------------
 
     def notify(self, obj, duration=4, bad=False, exception=None):
@@ -386,8 +354,10 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
             self.loader.remove(index=0)
 
     def get_cumulative_size(self):
+        # The selected directories share the subtotals listed from now on
+        since = time()
         for fobj in self.thistab.get_selection() or ():
-            fobj.look_up_cumulative_size()
+            fobj.look_up_cumulative_size(since)
         self.ui.status.request_redraw()
         self.ui.redraw_main_column()
 
@@ -1056,6 +1026,7 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
         elif order in ('size', 'mimetype', 'ctime', 'mtime', 'atime'):
             cwd = self.thisdir
             if original_order is not None or not cwd.cycle_list:
+                cwd.load_deferred_stats()
                 lst = list(cwd.files)
                 if order == 'size':
                     def fnc(item):
@@ -1800,7 +1771,8 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
         assert mode in ('set', 'add', 'remove', 'toggle')
         cwd = self.thisdir
         if not narg and not dirarg:
-            selected = (fobj for fobj in self.thistab.get_selection() if fobj in cwd.files)
+            selected = (fobj for fobj in self.thistab.get_selection()
+                        if cwd.index_of(fobj.path) is not None)
         else:
             if not dirarg and narg:
                 direction = Direction(down=1)
@@ -1911,11 +1883,10 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
             files = (fobj.path for fobj in self.thistab.get_selection())
         self.notify("Deleting {fls}!".format(fls=", ".join(files)))
         files = [os.path.abspath(path) for path in files]
-        for path in files:
-            # Untag the deleted files.
-            for tag in self.fm.tags.tags:
-                if str(tag).startswith(path):
-                    self.fm.tags.remove(tag)
+        # Untag the deleted files.
+        with self.fm.tags.batch():
+            for path in files:
+                self.fm.tags.remove(*self.fm.tags.paths_under(path))
         self.copy_buffer = set(fobj for fobj in self.copy_buffer if fobj.path not in files)
         for path in files:
             if isdir(path) and not os.path.islink(path):
@@ -0,0 +1,143 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""
+Cumulative sizes of directory trees, calculated in the background.
+
+The subtotal of every directory that is visited is cached, keyed by its
+device and inode number and validated by its mtime.  Looking up the size of
+the same tree again, or of a tree that shares parts with it, only needs to
+stat() the directories instead of listing them and stat()ing every file.
+Files with several hard links are counted once per tree.
+
+The mtime of a directory does not change when its files grow in place, so
+a calculation the user asks for lists again all directories which were
+listed before it was asked for.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import os
+from time import time
+
+from ranger.core.loader import Loadable
+from ranger.core.shared import FileManagerAware
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None  # pylint: disable=invalid-name
+
+
+class CumulativeSizeCache(object):
+    """The subtotals of the directories visited so far
+
+    Each entry maps (st_dev, st_ino) of a directory to a tuple of
+    (mtime, size, links, subdirs, listed): the mtime of the directory when
+    it was listed, the summed up size of its files, a dict of (st_dev,
+    st_ino) to size of its files which may be counted elsewhere in the tree
+    (hard links and symlinks), the names of its subdirectories and the time
+    when it was listed.
+    """
+
+    # Yield after stat()ing this many files of a single directory
+    yield_interval = 500
+
+    def __init__(self):
+        self.subtotals = {}
+
+    def clear(self):
+        self.subtotals.clear()
+
+    def _list_directory(self, path, result):
+        """A generator that lists a directory and stores its subtotal in result"""
+        size = 0
+        links = {}
+        subdirs = []
+        if scandir is None:
+            entries = [(os.path.join(path, name), name) for name in os.listdir(path)]
+        else:
+            entries = [(entry.path, entry.name) for entry in scandir(path)]
+        for i, (entry_path, name) in enumerate(entries):
+            if i % self.yield_interval == self.yield_interval - 1:
+                yield
+            try:
+                entry_lstat = os.lstat(entry_path)
+                is_link = entry_lstat.st_mode & 0o170000 == 0o120000
+                entry_stat = os.stat(entry_path) if is_link else entry_lstat
+            except OSError:
+                continue
+            if entry_stat.st_mode & 0o170000 == 0o040000:
+                if not is_link:
+                    subdirs.append(name)
+            elif is_link or entry_stat.st_nlink > 1:
+                links[(entry_stat.st_dev, entry_stat.st_ino)] = entry_stat.st_size
+            else:
+                size += entry_stat.st_size
+        result.extend((size, links, tuple(subdirs)))
+
+    def walk(self, path, since=None):
+        """A generator that calculates the cumulative size of a directory
+
+        It yields (size, percent) tuples regularly while it works, with the
+        size found so far and a rough estimate of the progress.  The last
+        tuple holds the total size.  Directories listed before the time
+        since are listed again, even if their mtime did not change.
+        """
+        size = 0
+        links = {}
+        done = 0
+        stack = [path]
+        while stack:
+            dirpath = stack.pop()
+            try:
+                dir_stat = os.stat(dirpath)
+            except OSError:
+                continue
+            key = (dir_stat.st_dev, dir_stat.st_ino)
+            subtotal = self.subtotals.get(key)
+            if subtotal is None or subtotal[0] != dir_stat.st_mtime \
+                    or (since is not None and subtotal[4] < since):
+                listed = time()
+                result = []
+                try:
+                    for _ in self._list_directory(dirpath, result):
+                        yield size, 100 * done // (done + len(stack) + 1)
+                except OSError:
+                    continue
+                subtotal = (dir_stat.st_mtime,) + tuple(result) + (listed,)
+                self.subtotals[key] = subtotal
+            size += subtotal[1]
+            for link, link_size in subtotal[2].items():
+                if link not in links:
+                    links[link] = link_size
+                    size += link_size
+            stack.extend(os.path.join(dirpath, name) for name in subtotal[3])
+            done += 1
+            yield size, 100 * done // (done + len(stack))
+
+
+class CumulativeSizeLoader(Loadable, FileManagerAware):
+    """Calculates the cumulative size of a directory through the Loader"""
+    progressbar_supported = True
+
+    def __init__(self, directory, since=None):
+        self.directory = directory
+        self.since = since
+        Loadable.__init__(self, self.generate(),
+                          'Calculating size of ' + directory.path)
+
+    def generate(self):
+        directory = self.directory
+        size = 0
+        walk = self.fm.cumulative_sizes.walk(directory.path, self.since)
+        for size, self.percent in walk:
+            # Show what was found so far, marked as incomplete
+            directory.set_cumulative_size(size, complete=False)
+            yield
+        directory.size_loader = None
+        directory.set_cumulative_size(size)
+
+    def destroy(self):
+        if self.directory.size_loader is self:
+            self.directory.size_loader = None
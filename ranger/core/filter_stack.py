@@ -181,6 +181,7 @@ class UniqueFilter(BaseFilter, FileManagerAware):
         return "<Filter: unique>"
 
     def get_unique(self):
+        self.fm.thisdir.load_deferred_stats()
         unique = set()
         for dups in group_by_hash(self.fm.thisdir.files_all):
             try:
@@ -21,13 +21,18 @@ from time import time
 import ranger.api
 from ranger.container import settings
 from ranger.container.bookmarks import Bookmarks
+from ranger.container.copy_buffer import CopyBuffer
 from ranger.container.directory import Directory
+from ranger.container.ratings import Ratings
 from ranger.container.tags import Tags, TagsDummy
 from ranger.core.actions import Actions
+from ranger.core.cumulative_size import CumulativeSizeCache
+from ranger.core.listing_cache import ListingCache
 from ranger.core.loader import Loader
 from ranger.core.metadata import MetadataManager
 from ranger.core.runner import Runner
 from ranger.core.tab import Tab
+from ranger.core.watcher import DirectoryWatcher
 from ranger.ext import logutils
 from ranger.ext.img_display import get_image_displayer
 from ranger.ext.posix_signals import call_signal_handler, delay_signal
@@ -100,9 +105,12 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
         self.previews = {}
         self.default_linemodes = deque()
         self.loader = Loader()
-        self.copy_buffer = set()
+        self.copy_buffer = CopyBuffer()
         self.do_cut = False
         self.metadata = MetadataManager()
+        self.listing_cache = None
+        self.cumulative_sizes = CumulativeSizeCache()
+        self.watcher = None
         self.image_displayer = None
         self.run = None
         self.rifle = None
@@ -113,7 +121,7 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
         self.widescreen = False
         self.vwidescreen = False
         self.tabs_path = {}
-        self.rating_info = []
+        self.ratings = Ratings(None)
         #add by sim1 -----------
         self.zombies = ProcessSet()
 
@@ -161,6 +169,25 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
             lambda signal: signal.fm.previews.clear(),
         )
 
+        self.watcher = DirectoryWatcher()
+
+        def set_watch_directories():
+            if self.settings.watch_directories:
+                self.watcher.start()
+            else:
+                self.watcher.stop()
+        set_watch_directories()
+        self.settings.signal_bind('setopt.watch_directories', set_watch_directories,
+                                  priority=settings.SIGNAL_PRIORITY_AFTER_SYNC)
+        for signal_name in ('cd', 'move', 'tab.change', 'tab.layoutchange'):
+            self.signal_bind(signal_name, self.watcher.request_sync)
+
+        self._bind_directory_settings()
+
+        if not ranger.args.clean:
+            self.listing_cache = ListingCache(
+                os.path.join(ranger.args.cachedir, 'listings'))
+
         if ranger.args.clean:
             self.tags = TagsDummy("")
         elif self.tags is None:
@@ -319,6 +346,8 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
             except Exception:  # pylint: disable=broad-except
                 if debug:
                     raise
+        if self.watcher:
+            self.watcher.stop()
 
     @staticmethod
     def get_log():
@@ -342,8 +371,17 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
     def _set_thisdir(self, obj):
         self.thistab.thisdir = obj
 
+    def _get_copy_buffer(self):
+        return self._copy_buffer
+
+    def _set_copy_buffer(self, files):
+        if not isinstance(files, CopyBuffer):
+            files = CopyBuffer(files)
+        self._copy_buffer = files  # pylint: disable=attribute-defined-outside-init
+
     thisfile = property(_get_thisfile, _set_thisfile)
     thisdir = property(_get_thisdir, _set_thisdir)
+    copy_buffer = property(_get_copy_buffer, _set_copy_buffer)
 
     # add by sim1 for toggle widescreen mode +++++
     def toggle_wide_mode(self):
@@ -451,6 +489,42 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
         """returns the path relative to rangers library directory"""
         return os.path.join(ranger.RANGERDIR, *paths)
 
+    def get_visible_directories(self):
+        """The directories on the path of each tab and in the current previews"""
+        directories = set()
+        for tab in self.tabs.values():
+            directories.update(tab.pathway)
+        for level in range(1, len(self.settings.column_ratios)):
+            directory = self.thistab.at_level(level)
+            if directory is None or not directory.is_directory:
+                break
+            directories.add(directory)
+        return directories
+
+    def _bind_directory_settings(self):
+        """Outdate the order or the filter of the directories on changes of settings
+
+        Only the visible directories are sorted and filtered right away,
+        the others when they are shown again.
+        """
+        def outdate_order():
+            Directory.outdate_order()
+            for directory in self.get_visible_directories():
+                directory.apply_settings()
+
+        def outdate_filter():
+            Directory.outdate_filter()
+            for directory in self.get_visible_directories():
+                directory.apply_settings()
+
+        for opt in ('sort_directories_first', 'sort', 'sort_reverse',
+                    'sort_case_insensitive', 'sort_unicode'):
+            self.settings.signal_bind('setopt.' + opt, outdate_order,
+                                      priority=settings.SIGNAL_PRIORITY_AFTER_SYNC)
+        for opt in ('hidden_filter', 'show_hidden'):
+            self.settings.signal_bind('setopt.' + opt, outdate_filter,
+                                      priority=settings.SIGNAL_PRIORITY_AFTER_SYNC)
+
     def get_directory(self, path, **dir_kwargs):
         """Get the directory object at the given path"""
         path = os.path.abspath(path)
@@ -512,6 +586,43 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
             del self.directories[key]
             if value.is_directory:
                 value.files = None
+                value.unbind_signals()
+        self.settings.signal_garbage_collect()
+        self.signal_garbage_collect()
+
+    def evict_directories(self):
+        """Forget the least recently used directories beyond max_cached_entries
+
+        Every directory object counts as one entry, plus one for each file
+        it lists.  The directories on the path of a tab and those being
+        loaded are never forgotten.
+        """
+        limit = self.settings.max_cached_entries
+        if limit is None:
+            return
+        total = 0
+        for directory in self.directories.values():
+            total += 1 + len(directory.files_all or ())
+        if total <= limit:
+            return
+
+        keep = set(directory.path for directory in self.get_visible_directories())
+        for item in self.loader.queue:
+            # Directories load themselves, size calculations refer to one
+            directory = getattr(item, 'directory', item)
+            if getattr(directory, 'is_directory', False):
+                keep.add(directory.path)
+        for directory in sorted(self.directories.values(),
+                                key=lambda directory: directory.last_used):
+            if total <= limit:
+                break
+            if directory.path in keep:
+                continue
+            del self.directories[directory.path]
+            directory.unbind_signals()
+            total -= 1 + len(directory.files_all or ())
+            # The listing of the parent may still refer to the directory
+            directory.unload_content()
         self.settings.signal_garbage_collect()
         self.signal_garbage_collect()
 
@@ -532,12 +643,15 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
         ui = self.ui
         throbber = ui.throbber
         loader = self.loader
+        watcher = self.watcher
         zombies = self.zombies
+        gc_tick = 0
 
         ranger.api.hook_ready(self)
 
         try:  # pylint: disable=too-many-nested-blocks
             while True:
+                watcher.process()
                 loader.work()
                 if loader.has_work():
                     throbber(loader.status)
@@ -557,10 +671,10 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
                         if zombie.poll() is not None:
                             zombies.remove(zombie)
 
-                # gc_tick += 1
-                # if gc_tick > ranger.TICKS_BEFORE_COLLECTING_GARBAGE:
-                    # gc_tick = 0
-                    # self.garbage_collect(ranger.TIME_BEFORE_FILE_BECOMES_GARBAGE)
+                gc_tick += 1
+                if gc_tick > ranger.TICKS_BEFORE_COLLECTING_GARBAGE:
+                    gc_tick = 0
+                    self.evict_directories()
 
         except KeyboardInterrupt:
             # this only happens in --debug mode. By default, interrupts
@@ -0,0 +1,144 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""
+A persistent cache of directory listings.
+
+The names and stat() results of the entries of big directories are stored in
+the cache directory, keyed by the path and the mtime of the directory.  When
+a directory is opened again, even by a new ranger instance, it can be shown
+right away from the cache while the real listing is loaded in the background.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import json
+import os
+from hashlib import sha1
+from io import open
+from logging import getLogger
+
+from ranger import PY3
+
+
+LOG = getLogger(__name__)
+
+CACHE_VERSION = 1
+
+
+def pack_stat(stat):
+    return list(stat[:7]) + [stat.st_atime, stat.st_mtime, stat.st_ctime]
+
+
+def unpack_stat(values):
+    return os.stat_result(values)
+
+
+class ListingCache(object):
+    # Listing small directories is cheap enough, don't clutter the cache
+    min_entries = 100
+    # How many listings to keep
+    max_listings = 500
+    # Look for old listings to delete after this many were stored
+    prune_interval = 32
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+        self._stored_mtimes = {}
+        self._stores_since_prune = self.prune_interval
+
+    def _get_filename(self, path):
+        if PY3:
+            path = path.encode('utf-8', 'surrogateescape')
+        return os.path.join(self.cachedir, sha1(path).hexdigest())
+
+    def get(self, path, mtime):
+        """Return the cached listing of a directory with the given mtime
+
+        The listing is a list of (path, stats, is_directory) tuples like the
+        ones that ranger.ext.scan_dir.stat_entry returns, or None if
+        the cache has no up to date listing of this directory.
+        """
+        filename = self._get_filename(path)
+        try:
+            with open(filename, 'r', encoding='utf-8') as fobj:
+                data = json.load(fobj)
+        except (OSError, IOError, ValueError):
+            return None
+        if data.get('version') != CACHE_VERSION or data.get('path') != path \
+                or data.get('mtime') != mtime:
+            return None
+        self._stored_mtimes[path] = mtime
+        try:
+            os.utime(filename, None)  # keep it from being pruned
+        except OSError:
+            pass
+
+        prefix = path if path == '/' else path + '/'
+        listing = []
+        for entry in data['entries']:
+            name = prefix + entry[0]
+            if len(entry) == 1:
+                listing.append((name, None, False))
+                continue
+            file_stat = unpack_stat(entry[1])
+            file_lstat = unpack_stat(entry[2]) if len(entry) > 2 else file_stat
+            is_dir = file_stat.st_mode & 0o170000 == 0o040000
+            listing.append((name, (file_stat, file_lstat), is_dir))
+        return listing
+
+    def store(self, path, mtime, listing):
+        """Store a listing of (path, stats) pairs of a directory"""
+        if len(listing) < self.min_entries or self._stored_mtimes.get(path) == mtime:
+            return
+
+        entries = []
+        for name, stats in listing:
+            name = os.path.basename(name)
+            if stats is None:
+                entries.append([name])
+            elif stats[0] is stats[1]:
+                entries.append([name, pack_stat(stats[0])])
+            else:
+                entries.append([name, pack_stat(stats[0]), pack_stat(stats[1])])
+        data = {'version': CACHE_VERSION, 'path': path, 'mtime': mtime, 'entries': entries}
+
+        filename = self._get_filename(path)
+        tmpname = filename + '.tmp'
+        try:
+            if not os.path.isdir(self.cachedir):
+                os.makedirs(self.cachedir)
+            with open(tmpname, 'w', encoding='utf-8') as fobj:
+                fobj.write(json.dumps(data, separators=(',', ':')))
+            os.rename(tmpname, filename)
+        except (OSError, IOError) as ex:
+            LOG.debug("Unable to cache the listing of %s: %s", path, ex)
+            return
+        self._stored_mtimes[path] = mtime
+
+        self._stores_since_prune += 1
+        if self._stores_since_prune >= self.prune_interval:
+            self._stores_since_prune = 0
+            self.prune()
+
+    def prune(self):
+        """Delete the least recently used listings beyond max_listings"""
+        try:
+            names = os.listdir(self.cachedir)
+        except OSError:
+            return
+        if len(names) <= self.max_listings:
+            return
+        aged = []
+        for name in names:
+            filename = os.path.join(self.cachedir, name)
+            try:
+                aged.append((os.stat(filename).st_mtime, filename))
+            except OSError:
+                pass
+        aged.sort()
+        for _, filename in aged[:len(aged) - self.max_listings]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
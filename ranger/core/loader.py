@@ -113,15 +113,8 @@ class CopyLoader(Loadable, FileManagerAware):  # pylint: disable=too-many-instan
             else:
                 self.description = "moving files from: " + self.one_file.dirname + size_str
             for fobj in self.copy_buffer:
-                for path in self.fm.tags.tags:
-                    if path == fobj.path or str(path).startswith(fobj.path):
-                        tag = self.fm.tags.tags[path]
-                        self.fm.tags.remove(path)
-                        new_path = path.replace(
-                            fobj.path,
-                            os.path.join(self.original_path, fobj.basename))
-                        self.fm.tags.tags[new_path] = tag
-                        self.fm.tags.dump()
+                self.fm.tags.update_path(
+                    fobj.path, os.path.join(self.original_path, fobj.basename))
                 n = 0
                 for n in shutil_g.move(src=fobj.path, dst=self.original_path,
                                        overwrite=self.overwrite,
@@ -0,0 +1,124 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""Keeps the visible directories up to date with inotify.
+
+Without it, ranger stat()s every visible directory on each redraw to see if
+its mtime changed, and reloads it completely if it did.  The watcher instead
+collects the names of the entries which were added, removed or modified and
+lets Directory.update_entries() handle just those.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from logging import getLogger
+
+from ranger.core.shared import FileManagerAware
+from ranger.ext.inotify import (
+    Inotify, IN_ATTRIB, IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_EXCL_UNLINK,
+    IN_IGNORED, IN_MODIFY, IN_MOVE_SELF, IN_MOVED_FROM, IN_MOVED_TO, IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+)
+
+
+LOG = getLogger(__name__)
+
+WATCH_MASK = (IN_ATTRIB | IN_CREATE | IN_DELETE | IN_MODIFY | IN_MOVED_FROM
+              | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+              | IN_EXCL_UNLINK)
+
+
+class DirectoryWatcher(FileManagerAware):
+    """Watches the directories of the tab pathways and the previews"""
+
+    def __init__(self):
+        self.inotify = None
+        self.watches = {}  # path -> watch descriptor
+        self.paths = {}  # watch descriptor -> path
+        self.need_sync = True
+
+    def __contains__(self, path):
+        return path in self.watches
+
+    def request_sync(self):
+        self.need_sync = True
+
+    def start(self):
+        if self.inotify is None:
+            try:
+                self.inotify = Inotify()
+            except OSError as ex:
+                LOG.info("Unable to watch directories: %s", ex)
+                return False
+            self.need_sync = True
+        return True
+
+    def stop(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self.watches.clear()
+        self.paths.clear()
+
+    def get_watched_directories(self):
+        return [directory for directory in self.fm.get_visible_directories()
+                if not directory.flat]
+
+    def sync(self):
+        """Watch exactly the directories which are currently visible"""
+        self.need_sync = False
+        directories = dict((directory.path, directory)
+                           for directory in self.get_watched_directories())
+
+        for path in set(self.watches) - set(directories):
+            wd = self.watches.pop(path)  # pylint: disable=invalid-name
+            del self.paths[wd]
+            self.inotify.rm_watch(wd)
+
+        for path, directory in directories.items():
+            if path in self.watches:
+                continue
+            # Pick up what changed before the watch existed
+            directory.load_content_if_outdated()
+            try:
+                wd = self.inotify.add_watch(path, WATCH_MASK)  # pylint: disable=invalid-name
+            except OSError as ex:
+                LOG.debug("Unable to watch %s: %s", path, ex)
+                continue
+            self.watches[path] = wd
+            self.paths[wd] = path
+
+    def process(self):
+        """Sync the watches if needed and hand the pending events to the directories"""
+        if self.inotify is None:
+            return
+        if self.need_sync:
+            self.sync()
+
+        changes = {}
+        for wd, mask, _, name in self.inotify.read_events():  # pylint: disable=invalid-name
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, fall back to full reloads
+                for path in self.watches:
+                    self._reload(path)
+                continue
+            path = self.paths.get(wd)
+            if path is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self._reload(path)
+                del self.paths[wd]
+                del self.watches[path]
+                self.need_sync = True
+            elif name is not None:
+                changes.setdefault(path, set()).add(name)
+
+        for path, names in changes.items():
+            directory = self.fm.directories.get(path)
+            if directory is not None:
+                directory.update_entries(names)
+
+    def _reload(self, path):
+        directory = self.fm.directories.get(path)
+        if directory is not None:
+            directory.request_reload()
@@ -3,6 +3,8 @@
 
 from __future__ import (absolute_import, division, print_function)
 
+from collections import OrderedDict
+
 
 # Similar to functools.lru_cache of python3
 def cached_function(fnc):
@@ -17,3 +19,37 @@ def cached_function(fnc):
             return value
     inner_cached_function._cache = cache  # pylint: disable=protected-access
     return inner_cached_function
+
+
+def lru_cached_function(maxsize):
+    """Like cached_function, but forget the least recently used results
+
+    >>> @lru_cached_function(2)
+    ... def double(x):
+    ...     return x * 2
+    >>> double(1), double(2), double(1), double(3)
+    (2, 4, 2, 6)
+    >>> sorted(double._cache)
+    [(1,), (3,)]
+    """
+    def decorator(fnc):
+        cache = OrderedDict()
+
+        def inner_lru_cached_function(*args):
+            try:
+                value = cache.pop(args)
+            except KeyError:
+                value = fnc(*args)
+                if len(cache) >= maxsize:
+                    cache.popitem(last=False)
+            cache[args] = value  # most recently used
+            return value
+        inner_lru_cached_function._cache = cache  # pylint: disable=protected-access
+        return inner_lru_cached_function
+    return decorator
+
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
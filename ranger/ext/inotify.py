@@ -0,0 +1,124 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""A minimal ctypes binding of the Linux inotify API.
+
+>>> import tempfile, shutil
+>>> tmpdir = tempfile.mkdtemp()
+>>> inotify = Inotify()
+>>> wd = inotify.add_watch(tmpdir, IN_CREATE | IN_DELETE)
+>>> open(os.path.join(tmpdir, 'new'), 'w').close()
+>>> [(event_wd == wd, mask & IN_CREATE != 0, name)
+...  for event_wd, mask, _, name in inotify.read_events()]
+[(True, True, 'new')]
+>>> inotify.read_events()
+[]
+>>> inotify.close()
+>>> shutil.rmtree(tmpdir)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+
+from ranger import PY3
+
+IN_ACCESS = 0x00000001
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    try:
+        functions = (libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch)
+    except AttributeError:
+        raise OSError(errno.ENOSYS, "inotify is not supported on this system")
+    functions[1].argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    functions[2].argtypes = (ctypes.c_int, ctypes.c_int)
+    return functions
+
+
+class Inotify(object):
+    """An inotify instance, raising OSError if inotify is unavailable"""
+
+    def __init__(self):
+        self._init, self._add_watch, self._rm_watch = _load_libc()
+        self.fd = self._init(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask):
+        """Watch a path for the events in mask, returning the watch descriptor"""
+        if PY3:
+            path = os.fsencode(path)
+        wd = self._add_watch(self.fd, path, mask)  # pylint: disable=invalid-name
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):  # pylint: disable=invalid-name
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Return the pending events as a list of (wd, mask, cookie, name)
+
+        The name is the entry inside a watched directory which the event is
+        about, or None if the event is about the watched path itself.
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as ex:
+                if ex.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    break
+                raise
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if PY3:
+                    name = os.fsdecode(name)
+                events.append((wd, mask, cookie, name or None))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
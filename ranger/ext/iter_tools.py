@@ -5,6 +5,11 @@ from __future__ import (absolute_import, division, print_function)
 
 from collections import deque
 
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None  # pylint: disable=invalid-name
+
 
 def flatten(lst):
     """Flatten an iterable.
@@ -45,6 +50,39 @@ def unique(iterable):
     return type(iterable)(already_seen)
 
 
+def threaded_map(function, iterable, workers):
+    """Like map(), but spread the calls over a pool of threads.
+
+    The results are yielded in the order of the iterable.  At most four
+    calls per worker are in flight at once, so the iterable may be huge
+    and the consumer may stop at any time.  Without a working thread pool
+    (workers < 2 or no concurrent.futures) this is a plain map().
+
+    >>> list(threaded_map(abs, [-3, 1, -2], 4))
+    [3, 1, 2]
+    >>> list(threaded_map(abs, [-3, 1, -2], 0))
+    [3, 1, 2]
+    """
+    if workers < 2 or ThreadPoolExecutor is None:
+        for item in iterable:
+            yield function(item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
 if __name__ == '__main__':
     import doctest
     import sys
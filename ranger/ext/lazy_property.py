@@ -40,23 +40,36 @@ class lazy_property(object):  # pylint: disable=invalid-name,too-few-public-meth
         self.__name__ = method.__name__
         self.__doc__ = method.__doc__
 
+    def __set_name__(self, owner, name):
+        # Also covers lazy properties made of lambdas, which have no name
+        self.__name__ = name
+        _install_reset(owner, name)
+
     def __get__(self, obj, cls=None):
         if obj is None:  # to fix issues with pydoc
             return None
 
-        reset_function_name = self.__name__ + "__reset"
-
-        if not hasattr(obj, reset_function_name):
-            def reset_function():
-                setattr(obj, self.__name__, self)
-                del obj.__dict__[self.__name__]  # force "__get__" being called
-            obj.__dict__[reset_function_name] = reset_function
+        name = self.__name__
+        if not hasattr(cls or type(obj), name + "__reset"):
+            # Python 2 has no __set_name__
+            _install_reset(cls or type(obj), name)
 
         result = self._method(obj)
-        obj.__dict__[self.__name__] = result
+        obj.__dict__[name] = result
         return result
 
 
+def _install_reset(owner, name):
+    """Add a method name__reset to the class, which forgets the value
+
+    Being a method of the class, it needs no memory per instance.
+    """
+    def reset(obj):
+        obj.__dict__.pop(name, None)  # force "__get__" being called
+    reset.__name__ = name + "__reset"
+    setattr(owner, reset.__name__, reset)
+
+
 if __name__ == '__main__':
     import doctest
     import sys
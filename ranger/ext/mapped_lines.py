@@ -0,0 +1,165 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""The lines of a file, read through mmap.
+
+Only the lines which are asked for are decoded.  To find them, the number of
+lines before every block of BLOCK_SIZE bytes is counted, so the index stays
+small no matter how big the file is.  The index is built as far as needed
+when a line is asked for, or block by block through index_generator().
+
+Touching the mapped pages past the end of a truncated file raises SIGBUS,
+so the size of the file is checked before each access.  A file which
+shrank is indexed again from the start, up to its new size.
+
+>>> import tempfile
+>>> with tempfile.NamedTemporaryFile() as fobj:
+...     _ = fobj.write(b'first\\r\\nsecond\\n' + b'x\\n' * 100000 + b'last')
+...     fobj.flush()
+...     lines = MappedLines(fobj.fileno())
+...     first_lines = lines[0], lines[1], lines[2]
+...     len_before = len(lines)
+...     lines.index_all()
+...     last_lines = len(lines), lines[100002], lines[-1]
+...     _ = fobj.truncate(14)
+...     truncated_lines = lines[-1], len(lines)
+...     lines.close()
+>>> first_lines
+('first\\n', 'second\\n', 'x\\n')
+>>> len_before < 100003
+True
+>>> last_lines
+(100003, 'last', 'last')
+>>> truncated_lines
+('second\\n', 2)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+
+BLOCK_SIZE = 64 * 1024
+# How many blocks index_generator() counts in one step
+BLOCKS_PER_STEP = 16
+# How many decoded lines to keep
+MAX_DECODED_LINES = 1000
+
+
+class MappedLines(object):  # pylint: disable=too-many-instance-attributes
+    """A sequence of the lines of the open file with the given descriptor"""
+
+    def __init__(self, fileno, encoding='utf-8', errors='ignore'):
+        self.encoding = encoding
+        self.errors = errors
+        self._fileno = fileno
+        self._map = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        self.size = len(self._map)
+        self._reset_index()
+
+    def _reset_index(self):
+        # The number of newlines before the start of each indexed block
+        self._block_lines = array('l')
+        self._newlines = 0
+        # The line number and offset of the line after the last one read,
+        # to continue from there when reading the next line
+        self._next_line = (0, 0)
+        self._decoded = {}
+
+    def _check_size(self):
+        """Stop at the end of the file if it was truncated"""
+        try:
+            size = os.fstat(self._fileno).st_size
+        except OSError:
+            return
+        if size < self.size:
+            self.size = size
+            self._reset_index()
+
+    @property
+    def complete(self):
+        return len(self._block_lines) * BLOCK_SIZE >= self.size
+
+    def __len__(self):
+        """The number of lines indexed so far"""
+        self._check_size()
+        if self.complete and self.size and self._map[self.size - 1:self.size] != b'\n':
+            return self._newlines + 1
+        return self._newlines
+
+    def _index_block(self):
+        start = len(self._block_lines) * BLOCK_SIZE
+        self._block_lines.append(self._newlines)
+        self._newlines += self._map[start:min(start + BLOCK_SIZE, self.size)].count(b'\n')
+
+    def index_lines(self, count):
+        """Index until count lines are known, or the whole file is"""
+        self._check_size()
+        while self._newlines < count and not self.complete:
+            self._index_block()
+
+    def index_all(self):
+        self._check_size()
+        while not self.complete:
+            self._index_block()
+
+    def index_generator(self):
+        """Index the file, yielding after every few blocks"""
+        while self._map is not None and not self.complete:
+            self._check_size()
+            for _ in range(BLOCKS_PER_STEP):
+                if self.complete:
+                    break
+                self._index_block()
+            yield
+
+    def _find_line(self, n):
+        """Return the offset of the start of line n"""
+        line, offset = self._next_line
+        if line > n or n - line > BLOCK_SIZE // 8:
+            # Start from the block which contains the start of the line
+            block = bisect_left(self._block_lines, n) - 1
+            if block < 0:
+                return 0
+            line, offset = self._block_lines[block], block * BLOCK_SIZE
+        while line < n:
+            offset = self._map.find(b'\n', offset, self.size) + 1
+            line += 1
+        return offset
+
+    def __getitem__(self, n):
+        if n < 0:
+            self.index_all()
+            n += len(self)
+        else:
+            self.index_lines(n + 1)
+        if not 0 <= n < len(self):
+            raise IndexError(n)
+        try:
+            return self._decoded[n]
+        except KeyError:
+            pass
+
+        start = self._find_line(n)
+        end = self._map.find(b'\n', start, self.size) + 1 or self.size
+        self._next_line = (n + 1, end)
+        data = self._map[start:end]
+        if data.endswith(b'\r\n'):
+            data = data[:-2] + b'\n'
+        if len(self._decoded) >= MAX_DECODED_LINES:
+            self._decoded.clear()
+        line = self._decoded[n] = data.decode(self.encoding, self.errors)
+        return line
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
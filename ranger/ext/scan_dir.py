@@ -0,0 +1,76 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""Listing directories and stat()ing their entries, for loading directories"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import os
+from os import stat as os_stat, lstat as os_lstat
+try:
+    from os import scandir
+except ImportError:
+    scandir = None  # pylint: disable=invalid-name
+
+
+def scan_entries(path):
+    """Lists a directory, classifying the entries by their d_type
+
+    Returns a list of (path, is_directory, is_link) tuples.  Unlike listing
+    the names and stat()ing each of them, this only needs a stat() syscall
+    for symlinks (to find out where they point to) and on file systems which
+    don't report the d_type.
+    """
+    entries = []
+    if scandir is None:
+        prefix = path if path == '/' else path + '/'
+        for name in os.listdir(path):
+            name = prefix + name
+            entries.append((name, os.path.isdir(name), os.path.islink(name)))
+        return entries
+    for entry in scandir(path):
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        entries.append((entry.path, is_dir, entry.is_symlink()))
+    return entries
+
+
+def scan_tree(path, level, mtimes, depth=0):
+    """Lists a directory tree in a single pass, one directory at a time
+
+    Yields (directory, entries) for path and each directory below it down
+    to the given level (-1 for no limit), where entries are the tuples of
+    scan_entries().  Symlinks to directories are only followed if level is
+    positive.  The mtime of every listed directory is stored in the dict
+    mtimes, so changes can be detected later without walking the tree.
+    depth is the depth of path below the top of the flattened tree.
+    """
+    stack = [(path, depth)]
+    while stack:
+        dirpath, depth = stack.pop()
+        try:
+            mtimes[dirpath] = os.stat(dirpath).st_mtime
+            entries = scan_entries(dirpath)
+        except OSError:
+            continue
+        yield dirpath, entries
+        if level != -1 and depth >= level:
+            continue
+        for name, is_dir, is_link in reversed(entries):
+            if is_dir and (level > 0 or not is_link):
+                stack.append((name, depth + 1))
+
+
+def stat_entry(path):
+    """Returns (path, stats, is_directory) with the stats used to preload a path"""
+    try:
+        file_lstat = os_lstat(path)
+        if file_lstat.st_mode & 0o170000 == 0o120000:
+            file_stat = os_stat(path)
+        else:
+            file_stat = file_lstat
+    except OSError:
+        return path, None, False
+    return path, (file_stat, file_lstat), file_stat.st_mode & 0o170000 == 0o040000
@@ -4,22 +4,45 @@
 
 from __future__ import (absolute_import, division, print_function)
 
+import re
 import sys
 from unicodedata import east_asian_width
 
 from ranger import PY3
+from ranger.ext.cached_function import lru_cached_function
 
 ASCIIONLY = set(chr(c) for c in range(1, 128))
 NARROW = 1
 WIDE = 2
 WIDE_SYMBOLS = set('WF')
+# How many non-ASCII strings to remember the characters of, and up to which
+# length.  Longer strings, like lines of file previews, rarely repeat.
+CHARLIST_CACHE_SIZE = 4096
+CHARLIST_CACHE_MAX_LENGTH = 256
+
+_NON_ASCII = re.compile('[^\x01-\x7f]')
+
+
+def is_ascii(string):
+    """Is every character of the string narrow and one byte long?
+
+    >>> is_ascii('hello'), is_ascii('モヒカン')
+    (True, False)
+    """
+    return _NON_ASCII.search(string) is None
 
 
 def uwid(string):
-    """Return the width of a string"""
+    """Return the width of a string
+
+    >>> uwid('hello'), uwid('モヒカン')
+    (5, 8)
+    """
     if not PY3:
         string = string.decode('utf-8', 'ignore')
-    return sum(utf_char_width(c) for c in string)
+    if is_ascii(string):
+        return len(string)
+    return len(_get_wide_charlist(string))
 
 
 def utf_char_width(string):
@@ -29,32 +52,71 @@ def utf_char_width(string):
     return NARROW
 
 
+def _wide_charlist(string):
+    result = []
+    for char in string:
+        result.append(char)
+        if char > '\x7f' and east_asian_width(char) in WIDE_SYMBOLS:
+            result.append('')
+    return tuple(result)
+
+
+_cached_wide_charlist = lru_cached_function(CHARLIST_CACHE_SIZE)(_wide_charlist)
+
+
+def _get_wide_charlist(string):
+    if len(string) > CHARLIST_CACHE_MAX_LENGTH:
+        return _wide_charlist(string)
+    return _cached_wide_charlist(string)
+
+
 def string_to_charlist(string):
     """Return a list of characters with extra empty strings after wide chars"""
-    if not set(string) - ASCIIONLY:
+    if is_ascii(string):
         return list(string)
-    result = []
     if PY3:
-        for char in string:
-            result.append(char)
-            if east_asian_width(char) in WIDE_SYMBOLS:
-                result.append('')
-    else:
-        try:
-            # This raised a "UnicodeEncodeError: 'ascii' codec can't encode
-            # character u'\xe4' in position 10: ordinal not in range(128)"
-            # for me once.  I thought errors='ignore' means IGNORE THE DAMN
-            # ERRORS but apparently it doesn't.
-            string = string.decode('utf-8', 'ignore')
-        except UnicodeEncodeError:
-            return []
-        for char in string:
-            result.append(char.encode('utf-8'))
-            if east_asian_width(char) in WIDE_SYMBOLS:
-                result.append('')
+        return list(_get_wide_charlist(string))
+    result = []
+    try:
+        # This raised a "UnicodeEncodeError: 'ascii' codec can't encode
+        # character u'\xe4' in position 10: ordinal not in range(128)"
+        # for me once.  I thought errors='ignore' means IGNORE THE DAMN
+        # ERRORS but apparently it doesn't.
+        string = string.decode('utf-8', 'ignore')
+    except UnicodeEncodeError:
+        return []
+    for char in string:
+        result.append(char.encode('utf-8'))
+        if east_asian_width(char) in WIDE_SYMBOLS:
+            result.append('')
     return result
 
 
+def slice_charlist(chars, start, stop):
+    """Join the characters between the columns start and stop
+
+    Halves of wide characters at the edges are replaced with spaces.
+
+    >>> slice_charlist(string_to_charlist("モヒカン"), 1, 5)
+    ' ヒ '
+    """
+    if stop is None or stop > len(chars):
+        stop = len(chars)
+    if stop < 0:
+        stop = len(chars) + stop
+    if stop < 0:
+        return ""
+    if start is None or start < 0:
+        start = 0
+    if stop < len(chars) and chars[stop] == '':
+        if chars[start] == '':
+            return ' ' + ''.join(chars[start:stop - 1]) + ' '
+        return ''.join(chars[start:stop - 1]) + ' '
+    if chars[start] == '':
+        return ' ' + ''.join(chars[start:stop - 1])
+    return ''.join(chars[start:stop])
+
+
 class WideString(object):  # pylint: disable=too-few-public-methods
 
     def __init__(self, string, chars=None):
@@ -124,21 +186,7 @@ class WideString(object):  # pylint: disable=too-few-public-methods
         >>> WideString("aモ")[0:1]
         <WideString 'a'>
         """
-        if stop is None or stop > len(self.chars):
-            stop = len(self.chars)
-        if stop < 0:
-            stop = len(self.chars) + stop
-        if stop < 0:
-            return WideString("")
-        if start is None or start < 0:
-            start = 0
-        if stop < len(self.chars) and self.chars[stop] == '':
-            if self.chars[start] == '':
-                return WideString(' ' + ''.join(self.chars[start:stop - 1]) + ' ')
-            return WideString(''.join(self.chars[start:stop - 1]) + ' ')
-        if self.chars[start] == '':
-            return WideString(' ' + ''.join(self.chars[start:stop - 1]))
-        return WideString(''.join(self.chars[start:stop]))
+        return WideString(slice_charlist(self.chars, start, stop))
 
     def __getitem__(self, i):
         """
@@ -8,7 +8,8 @@ from __future__ import (absolute_import, division, print_function)
 
 import re
 
-from ranger.ext.widestring import WideString
+from ranger.ext.cached_function import lru_cached_function
+from ranger.ext.widestring import WideString, is_ascii, slice_charlist, string_to_charlist
 from ranger.gui import color
 
 
@@ -18,6 +19,10 @@ codesplit_re = re.compile(r'38;5;(\d+);|48;5;(\d+);|(\d*);')
 reset = '\x1b[0m'
 # pylint: enable=invalid-name
 
+# How many texts to remember the segments and attributes of.  The pager
+# keeps the segments of its lines itself.
+CACHE_SIZE = 4096
+
 
 def split_ansi_from_text(ansi_text):
     if isinstance(ansi_text, WideString):
@@ -29,7 +34,20 @@ def split_ansi_from_text(ansi_text):
 # githttp://en.wikipedia.org/wiki/ANSI_escape_code
 
 
-def text_with_fg_bg_attr(ansi_text):  # pylint: disable=too-many-branches,too-many-statements
+def text_with_fg_bg_attr(ansi_text):
+    """Yield the text chunks and (fg, bg, attr) tuples of the ansi codes"""
+    if isinstance(ansi_text, WideString):
+        ansi_text = ansi_text.string
+    for chunk in _text_with_fg_bg_attr(ansi_text):
+        yield chunk
+
+
+@lru_cached_function(CACHE_SIZE)
+def _text_with_fg_bg_attr(ansi_text):
+    return tuple(_parse_fg_bg_attr(ansi_text))
+
+
+def _parse_fg_bg_attr(ansi_text):  # pylint: disable=too-many-branches,too-many-statements
     fg, bg, attr = -1, -1, 0
     for chunk in split_ansi_from_text(ansi_text):
         if chunk and chunk[0] == '\x1b':
@@ -126,7 +144,44 @@ def char_len(ansi_text):
     if isinstance(ansi_text, WideString):
         ansi_text = ansi_text.string
 
-    return len(WideString(ansi_re.sub('', ansi_text)))
+    segments = _split_segments_cached(ansi_text)
+    return segments[-1][4] if segments else 0
+
+
+def split_segments(ansi_text):
+    """Split the text into segments to slice it without parsing it again
+
+    A segment is a tuple of the last ansi code before it, its text, the list
+    of its characters (None for ASCII text) and its start and end column.
+
+    >>> split_segments("ab\\x1b[30mモ")
+    (('', 'ab', None, 0, 2), ('\\x1b[30m', 'モ', ['モ', ''], 2, 4))
+    """
+    segments = []
+    last_color = ""
+    pos = 0
+    for i, chunk in enumerate(split_ansi_from_text(ansi_text)):
+        if i % 2 == 1:
+            last_color = chunk
+            continue
+        if is_ascii(chunk):
+            chars = None
+            width = len(chunk)
+        else:
+            chars = string_to_charlist(chunk)
+            width = len(chars)
+        segments.append((last_color, chunk, chars, pos, pos + width))
+        pos += width
+    return tuple(segments)
+
+
+_split_segments_cached = lru_cached_function(CACHE_SIZE)(split_segments)
+
+
+def _slice_segment(chunk, chars, start, stop):
+    if chars is None:
+        return chunk[max(0, start):stop]
+    return slice_charlist(chars, start, stop)
 
 
 def char_slice(ansi_text, start, length):
@@ -153,28 +208,28 @@ def char_slice(ansi_text, start, length):
     >>> char_slice(test_string, 9, 4)
     '\\x1b[31mar\\x1b[0mno'
     """
-    chunks = []
-    last_color = ""
-    pos = old_pos = 0
-    for i, chunk in enumerate(split_ansi_from_text(ansi_text)):
-        if i % 2 == 1:
-            last_color = chunk
-            continue
+    if isinstance(ansi_text, WideString):
+        ansi_text = ansi_text.string
+
+    return slice_segments(_split_segments_cached(ansi_text), start, length)
 
-        chunk = WideString(chunk)
-        old_pos = pos
-        pos += len(chunk)
+
+def slice_segments(segments, start, length):
+    """Like char_slice(), for the segments of a text"""
+    chunks = []
+    for last_color, chunk, chars, old_pos, pos in segments:
         if pos <= start:
             pass  # seek
         elif old_pos < start <= pos:
             chunks.append(last_color)
-            chunks.append(str(chunk[start - old_pos:start - old_pos + length]))
+            chunks.append(_slice_segment(chunk, chars, start - old_pos,
+                                         start - old_pos + length))
         elif pos > length + start:
             chunks.append(last_color)
-            chunks.append(str(chunk[:start - old_pos + length]))
+            chunks.append(_slice_segment(chunk, chars, 0, start - old_pos + length))
         else:
             chunks.append(last_color)
-            chunks.append(str(chunk))
+            chunks.append(chunk)
         if pos - start >= length:
             break
     return ''.join(chunks)
@@ -24,6 +24,7 @@ class Displayable(  # pylint: disable=too-many-instance-attributes
     Subclasses of displayable can extend these methods:
 
     draw() -- draw the object. Is only called if visible.
+    damage_key() -- return the state the drawing depends on.
     poke() -- is called just before draw(), even if not visible.
     finalize() -- called after all objects finished drawing.
     click(event) -- called with a MouseEvent. This is called on all
@@ -49,8 +50,11 @@ class Displayable(  # pylint: disable=too-many-instance-attributes
         parent -- the parent (DisplayableContainer) object or None
         x, y, wid, hei -- absolute coordinates and boundaries
         settings, fm -- inherited shared variables
+        drawn_damage_key -- the damage_key() of the last drawing
     """
 
+    drawn_damage_key = None
+
     def __init__(self, win,  # pylint: disable=super-init-not-called
                  env=None, fm=None, settings=None):
         from ranger.gui.ui import UI
@@ -107,6 +111,15 @@ class Displayable(  # pylint: disable=too-many-instance-attributes
         draw() on their contained objects here.  Override this!
         """
 
+    def damage_key(self):
+        """Return a value which changes whenever draw() would draw differently.
+
+        The UI skips drawing a widget while its damage key stays the same
+        and need_redraw is not set.  None means that the widget has to be
+        drawn every time.  Override this!
+        """
+        return None
+
     def destroy(self):
         """Called when the object is destroyed."""
         self.win = None
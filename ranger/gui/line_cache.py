@@ -0,0 +1,102 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""A cache of rendered lines, shared by all browser columns.
+
+The least recently used lines are evicted once the approximate size of the
+cached lines exceeds a byte budget.
+
+>>> cache = LineCache(max_bytes=1000)
+>>> cache.get('a') is None
+True
+>>> cache.put('a', [['some text', 0]])
+>>> cache.get('a')
+[['some text', 0]]
+>>> cache.hits, cache.misses
+(1, 1)
+>>> for i in range(100):
+...     cache.put(i, [['x' * 10, 0]])
+>>> cache.get('a') is None, cache.size <= 1000
+(True, True)
+>>> cache.get_id(('a', 1)), cache.get_id(('b', 2)), cache.get_id(('a', 1))
+(0, 1, 0)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from collections import OrderedDict
+
+# Estimated bytes of a cache entry and of each [text, attribute] piece,
+# on top of the length of the text
+ENTRY_OVERHEAD = 200
+PIECE_OVERHEAD = 120
+# How many keys get_id() remembers
+MAX_IDS = 1000
+
+
+class LineCache(object):  # pylint: disable=too-many-instance-attributes
+    """Maps line keys to lists of [text, attribute] pieces"""
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lines = OrderedDict()  # key -> (pieces, size)
+        self._ids = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def get(self, key):
+        try:
+            entry = self._lines.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._lines[key] = entry  # most recently used
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, pieces):
+        size = ENTRY_OVERHEAD + sum(PIECE_OVERHEAD + len(text) for text, _ in pieces)
+        old = self._lines.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self._lines[key] = (pieces, size)
+        self.size += size
+        while self.size > self.max_bytes and self._lines:
+            _, (_, evicted_size) = self._lines.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def get_id(self, key):
+        """A small integer standing for key, to build short line keys with
+
+        Integers are never handed out twice, so lines which were cached with
+        an integer that was forgotten simply are not hit again.
+        """
+        try:
+            return self._ids[key]
+        except KeyError:
+            if len(self._ids) >= MAX_IDS:
+                self._ids.clear()
+            ident = self._ids[key] = self._next_id
+            self._next_id += 1
+            return ident
+
+    def clear(self):
+        self._lines.clear()
+        self.size = 0
+
+    def get_stats(self):
+        return "{0} lines, {1} bytes, {2} hits, {3} misses, {4} evictions".format(
+            len(self._lines), self.size, self.hits, self.misses, self.evictions)
+
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
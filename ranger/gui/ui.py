@@ -8,6 +8,7 @@ import sys
 import threading
 import curses
 from subprocess import CalledProcessError
+from time import time
 
 from ranger.ext.get_executables import get_executables
 from ranger.ext.keybinding_parser import KeyBuffer, KeyMaps, ALT_KEY
@@ -83,10 +84,19 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         self.pager = None
         self.multiplexer = None
         self._draw_title = None
+        self._title = None
+        self._drawn_visibility = None
         self._tmux_automatic_rename = None
         self._multiplexer_title = None
         self.browser = None
 
+        # Frame time statistics, see get_frame_stats()
+        self.frames = 0
+        self.frames_drawn = 0
+        self.frame_time_last = 0
+        self.frame_time_total = 0
+        self.frame_time_max = 0
+
         if fm is not None:
             self.fm = fm
 
@@ -134,6 +144,9 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
 
         self.update_size()
         self.is_on = True
+        # The screen and the title may have been changed by other programs
+        self.need_redraw = True
+        self._title = None
 
         self.handle_multiplexer()
 
@@ -193,8 +206,8 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         if not self.console.visible:
             DisplayableContainer.click(self, event)
 
-    def handle_key(self, key):
-        """Handles key input"""
+    def handle_key(self, key, repeat=1):
+        """Handles key input, pressed repeat times in a row"""
         self.hint()
 
         if key < 0:
@@ -202,9 +215,9 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
 
         elif not DisplayableContainer.press(self, key):
             self.keymaps.use_keymap('browser')
-            self.press(key)
+            self.press(key, repeat)
 
-    def press(self, key):
+    def press(self, key, repeat=1):
         keybuffer = self.keybuffer
         self.status.clear_message()
 
@@ -214,11 +227,14 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
             and keybuffer.finished_parsing_quantifier
 
         if keybuffer.result is not None:
+            quantifier = keybuffer.quantifier
+            if repeat > 1:
+                quantifier = (quantifier or 1) * repeat
             try:
                 self.fm.execute_console(
                     keybuffer.result,
                     wildcards=keybuffer.wildcards,
-                    quantifier=keybuffer.quantifier,
+                    quantifier=quantifier,
                 )
             finally:
                 if keybuffer.finished_parsing:
@@ -232,6 +248,40 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         for key in keys:
             self.handle_key(key)
 
+    def _is_coalescable(self, key):
+        """Is key bound to a relative vertical move in the browser?
+
+        Pressing such a key n times is the same as moving once with the
+        quantifier n.
+        """
+        if self.keybuffer.keys or self.get_focused_obj() is not None:
+            return False
+        command = self.keymaps.get('browser', {}).get(key)
+        if not isinstance(command, str):
+            return False
+        words = command.split()
+        if words[0] != 'move' or len(words) == 1:
+            return False
+        keywords = set(word.partition('=')[0] for word in words[1:])
+        return bool(keywords & set(['up', 'down'])) \
+            and keywords <= set(['up', 'down', 'pages'])
+
+    def _read_repeats(self, key):
+        """Read the pending repetitions of key and return their number"""
+        limit = self.settings.max_coalesced_keys
+        repeats = 0
+        previous_load_mode = self.load_mode
+        self.set_load_mode(True)
+        while repeats + 1 < limit:
+            getkey = self.win.getch()
+            if getkey != key:
+                if getkey != -1:
+                    curses.ungetch(getkey)
+                break
+            repeats += 1
+        self.set_load_mode(previous_load_mode)
+        return repeats
+
     def handle_input(self):  # pylint: disable=too-many-branches
         key = self.win.getch()
         if key == curses.KEY_ENTER:
@@ -262,6 +312,12 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         else:
             # Handle simple key presses, CTRL+X, etc here:
             if key >= 0:
+                # Held down movement keys are handled as one move, so there
+                # is only one redraw and no previews of the files in between
+                repeat = 1
+                if key not in (curses.KEY_MOUSE, curses.KEY_RESIZE) \
+                        and self._is_coalescable(key):
+                    repeat += self._read_repeats(key)
                 if self.settings.flushinput and not self.console.visible:
                     curses.flushinp()
                 if key == curses.KEY_MOUSE:
@@ -270,7 +326,7 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
                     self.update_size()
                 else:
                     if not self.fm.input_is_blocked():
-                        self.handle_key(key)
+                        self.handle_key(key, repeat)
             elif key == -1 and not os.isatty(sys.stdin.fileno()):
                 # STDIN has been closed
                 self.fm.exit()
@@ -313,6 +369,9 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         self.pager.visible = False
         self.add_child(self.pager)
 
+        # Options may change how any widget looks
+        self.settings.signal_bind('setopt', self.redraw_all)
+
     @lazy_property
     def vcsthread(self):
         """VCS thread"""
@@ -322,9 +381,10 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         return thread
 
     def redraw(self):
-        """Redraw all widgets"""
+        """Redraw all widgets whose state changed"""
         self.redrawlock.wait()
         self.redrawlock.clear()
+        start = time()
         self.poke()
 
         # determine which widgets are shown
@@ -339,8 +399,24 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
 
         self.draw()
         self.finalize()
+
+        self.frame_time_last = time() - start
+        self.frame_time_total += self.frame_time_last
+        self.frame_time_max = max(self.frame_time_max, self.frame_time_last)
+        self.frames += 1
         self.redrawlock.set()
 
+    def redraw_all(self):
+        """Draw all widgets during the next redraw, changed or not"""
+        self.need_redraw = True
+
+    def get_frame_stats(self):
+        return ("{0} frames, {1} drawn, last {2:.2f} ms, average {3:.2f} ms, "
+                "max {4:.2f} ms".format(
+                    self.frames, self.frames_drawn, self.frame_time_last * 1000,
+                    self.frame_time_total * 1000 / max(1, self.frames),
+                    self.frame_time_max * 1000))
+
     def redraw_window(self):
         """Redraw the window. This only calls self.win.redrawwin()."""
         self.win.erase()
@@ -348,6 +424,7 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         self.win.refresh()
         self.win.redrawwin()
         self.need_redraw = True
+        self._title = None
 
     def update_size(self):
         """resize all widgets"""
@@ -362,42 +439,75 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         self.console.resize(y - 1, 0, 1, x)
 
     def draw(self):
-        """Draw all objects in the container"""
-        self.win.touchwin()
-        DisplayableContainer.draw(self)
+        """Draw the widgets whose damage key changed
+
+        Only the lines of the drawn widgets are marked for the refresh, which
+        happens in finalize().
+        """
+        visibility = tuple(displayable.visible for displayable in self.container)
+        touch_all = self.need_redraw or visibility != self._drawn_visibility
+        self._drawn_visibility = visibility
+        drawn = False
+        for displayable in self.container:
+            if self.need_redraw:
+                displayable.need_redraw = True
+            if not displayable.visible:
+                continue
+            key = displayable.damage_key()
+            if key is None or displayable.need_redraw \
+                    or key != displayable.drawn_damage_key:
+                displayable.draw()
+                displayable.drawn_damage_key = key
+                drawn = True
+                if not touch_all:
+                    try:
+                        self.win.touchline(displayable.y, displayable.hei)
+                    except curses.error:
+                        pass
+        self.need_redraw = False
+
+        if touch_all:
+            self.win.touchwin()
+        if touch_all or drawn:
+            self.frames_drawn += 1
         if self._draw_title and self.settings.update_title:
-            if self.fm.thisdir:
-                cwd = self.fm.thisdir.path
-                if self.settings.tilde_in_titlebar \
-                   and (cwd == self.fm.home_path
-                        or cwd.startswith(self.fm.home_path + "/")):
-                    cwd = '~' + cwd[len(self.fm.home_path):]
-                if self.settings.shorten_title:
-                    split = cwd.rsplit(os.sep, self.settings.shorten_title)
-                    if os.sep in split[0]:
-                        cwd = os.sep.join(split[1:])
-            else:
-                cwd = "not accessible"
-            try:
-                fixed_cwd = cwd.encode('utf-8', 'surrogateescape'). \
-                    decode('utf-8', 'replace')
-                titlecap = curses.tigetstr('tsl')
-                escapes = (
-                    [titlecap.decode("latin-1")]
-                    if titlecap is not None
-                    else [] + [ESCAPE_ICON_TITLE]
-                )
-                belcap = curses.tigetstr('fsl')
-                bel = belcap.decode('latin-1') if belcap is not None else ""
-                fmt_tups = [(e, fixed_cwd, bel) for e in escapes]
-            except UnicodeError:
-                pass
-            else:
-                for fmt_tup in fmt_tups:
-                    sys.stdout.write("%sranger:%s%s" % fmt_tup)
-                    sys.stdout.flush()
-
-        self.win.refresh()
+            self._update_title()
+
+    def _update_title(self):
+        """Set the terminal title to the current directory, if it changed"""
+        if self.fm.thisdir:
+            cwd = self.fm.thisdir.path
+            if self.settings.tilde_in_titlebar \
+               and (cwd == self.fm.home_path
+                    or cwd.startswith(self.fm.home_path + "/")):
+                cwd = '~' + cwd[len(self.fm.home_path):]
+            if self.settings.shorten_title:
+                split = cwd.rsplit(os.sep, self.settings.shorten_title)
+                if os.sep in split[0]:
+                    cwd = os.sep.join(split[1:])
+        else:
+            cwd = "not accessible"
+        if cwd == self._title:
+            return
+        self._title = cwd
+        try:
+            fixed_cwd = cwd.encode('utf-8', 'surrogateescape'). \
+                decode('utf-8', 'replace')
+            titlecap = curses.tigetstr('tsl')
+            escapes = (
+                [titlecap.decode("latin-1")]
+                if titlecap is not None
+                else [] + [ESCAPE_ICON_TITLE]
+            )
+            belcap = curses.tigetstr('fsl')
+            bel = belcap.decode('latin-1') if belcap is not None else ""
+            fmt_tups = [(e, fixed_cwd, bel) for e in escapes]
+        except UnicodeError:
+            pass
+        else:
+            for fmt_tup in fmt_tups:
+                sys.stdout.write("%sranger:%s%s" % fmt_tup)
+                sys.stdout.flush()
 
     def finalize(self):
         """Finalize every object in container and refresh the window"""
@@ -16,6 +16,7 @@ from ranger.core import linemode
 
 from ranger.gui import ansi
 from ranger.gui.color import get_color
+from ranger.gui.line_cache import LineCache
 from ranger.gui.widgets import Widget
 from ranger.gui.widgets.pager import Pager
 
@@ -24,6 +25,10 @@ def hook_before_drawing(fsobject, color_list):
     return fsobject, color_list
 
 
+# The rendered lines of all browser columns
+LINE_CACHE = LineCache()
+
+
 class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
     main_column = False
     display_infostring = False
@@ -31,6 +36,7 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
     scroll_begin = 0
     target = None
     last_redraw_time = -1
+    index_in_background = False
 
     old_dir = None
     old_thisfile = None
@@ -174,6 +180,23 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             tab = self.tab
         self.target = tab.at_level(self.level)
 
+    def damage_key(self):
+        """Load what draw() would load and return what it would check"""
+        target = self.target
+        if not target:
+            return (target,)
+        if target.is_directory and (self.level <= 0 or self.settings.preview_directories):
+            target.load_content_if_outdated()
+            target.sort_if_outdated()
+            pointed_obj = target.pointed_obj
+            if pointed_obj:
+                pointed_obj.load_if_outdated()
+                return (target, target.last_update_time, target.sort_generation,
+                        pointed_obj, pointed_obj.last_load_time)
+            return (target, target.last_update_time, target.sort_generation, None)
+        target.load_if_outdated()
+        return (target, target.last_load_time)
+
     def draw(self):
         """Call either _draw_file() or _draw_directory()"""
         target = self.target
@@ -296,7 +319,7 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
 
         self._set_scroll_begin()
 
-        copied = [f.path for f in self.fm.copy_buffer]
+        copied = self.fm.copy_buffer
 
         selected_i = self._get_index_of_selected_file()
 
@@ -321,6 +344,15 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             linum_text_len = nr_of_digits(scroll_end + one_indexed_offset)
         #linum_format = "{0:>" + str(linum_text_len) + "}"
 
+        # What all lines of this column have in common, including the
+        # generations of the things that can change how any line looks
+        column_id = LINE_CACHE.get_id((
+            self.wid, self.main_column, active_pane, self.display_infostring,
+            self.settings.display_size_in_main_column, self.settings.colorscheme,
+            self.settings.line_numbers.lower(), linum_text_len,
+            self.target.has_vcschild, self.fm.do_cut, copied.generation,
+            getattr(self.fm.tags, 'generation', 0), self.fm.ratings.generation))
+
         for line in range(self.hei):
             i = line + self.scroll_begin
 
@@ -335,12 +367,7 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
                 drawn = self.target.files[i]
             except IndexError:
                 break
-
-            tagged = self.fm.tags and drawn.realpath in self.fm.tags
-            if tagged:
-                tagged_marker = self.fm.tags.marker(drawn.realpath)
-            else:
-                tagged_marker = " "
+            drawn.load_once()
 
             # Extract linemode-related information from the drawn object
             metadata = None
@@ -352,14 +379,13 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
                     current_linemode = drawn.linemode_dict[linemode.DEFAULT_LINEMODE]
 
             metakey = hash(repr(sorted(metadata.items()))) if metadata else 0
-            key = (self.wid, selected_i == i, drawn.marked, self.main_column,
-                   drawn.path in copied, tagged_marker, drawn.infostring,
-                   drawn.vcsstatus, drawn.vcsremotestatus, self.target.has_vcschild,
-                   self.fm.do_cut, current_linemode.name, metakey, active_pane,
-                   self.settings.line_numbers.lower(), linum_text_len)
+            key = (drawn.display_generation, selected_i == i, drawn.marked,
+                   drawn.infostring, drawn.vcsstatus, drawn.vcsremotestatus,
+                   current_linemode.name, metakey, column_id)
 
             # Check if current line has not already computed and cached
-            if key in drawn.display_data:
+            display_data = LINE_CACHE.get(key)
+            if display_data is not None:
                 # Recompute line numbers because they can't be reliably cached.
                 if (
                     self.main_column
@@ -368,9 +394,9 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
                     line_number_text = self._format_line_number(linum_format,
                                                                 i,
                                                                 selected_i)
-                    drawn.display_data[key][0][0] = line_number_text
+                    display_data[0][0] = line_number_text
 
-                self.execute_curses_batch(line, drawn.display_data[key])
+                self.execute_curses_batch(line, display_data)
                 self.color_reset()
                 continue
 
@@ -456,7 +482,6 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             this_color = base_color + list(drawn.mimetype_tuple) + \
                 self._draw_directory_color(i, drawn, copied)
             display_data = []
-            drawn.display_data[key] = display_data
 
             drawn, this_color = hook_before_drawing(drawn, this_color)
 
@@ -464,6 +489,8 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             for txt, color in predisplay:
                 attr = self.settings.colorscheme.get(*(this_color + color))
                 display_data.append([txt, attr])
+            # Cached once complete, the cache sizes entries when they are put
+            LINE_CACHE.put(key, display_data)
 
             self.execute_curses_batch(line, display_data)
             self.color_reset()
@@ -507,15 +534,11 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
 
     # add by sim1:
     def _get_rating_stars(self, drawn):
-        stars = ''
-        if self.fm.rating_info:
-            for ratings in self.fm.rating_info:
-                if ratings["path"] == drawn.path:
-                    for i in range(int(ratings["star"])):
-                        if 'DISPLAY' in os.environ:
-                            stars += ''
-                        else:
-                            stars += '★'
+        stars = self.fm.ratings.get(drawn.path)
+        if 'DISPLAY' in os.environ:
+            stars = '' * stars
+        else:
+            stars = '★' * stars
         if stars:
             '''
             mults = 7 - len(stars)
@@ -602,7 +625,7 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             if drawn.is_device:
                 this_color.append('device')
 
-        if drawn.path in copied:
+        if copied.has_path(drawn.path):
             this_color.append('cut' if self.fm.do_cut else 'copied')
 
         if drawn.is_link:
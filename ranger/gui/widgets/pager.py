@@ -7,21 +7,35 @@ from __future__ import (absolute_import, division, print_function)
 
 import curses
 import logging
+import mmap
+import os
+from stat import S_ISREG
 
+from ranger import PY3
+from ranger.core.loader import Loadable
 from ranger.gui import ansi
 from ranger.ext.direction import Direction
 from ranger.ext.img_display import ImgDisplayUnsupportedException
+from ranger.ext.mapped_lines import MappedLines
 
 from . import Widget
 
 
 LOG = logging.getLogger(__name__)
 
+# How many lines to remember the ansi segments of
+MAX_SEGMENTED_LINES = 10000
+# Regular files of at least this size are read through mmap
+MIN_MAPPED_SIZE = 1024 * 1024
+
 
 # TODO: Scrolling in embedded pager
 class Pager(Widget):  # pylint: disable=too-many-instance-attributes
     source = None
     source_is_stream = False
+    source_is_mapped = False
+    # Whether to index the lines of mapped files with the loader
+    index_in_background = True
 
     old_source = None
     old_scroll_begin = 0
@@ -38,16 +52,25 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
         self.startx = 0
         self.markup = None
         self.lines = []
+        self._segments = {}
         self.image = None
         self.image_drawn = False
+        self._indexer = None
 
     def _close_source(self):
-        if self.source and self.source_is_stream:
+        if self.source and (self.source_is_stream or self.source_is_mapped):
             try:
                 self.source.close()
             except OSError as ex:
                 LOG.error('Unable to close pager source')
                 LOG.exception(ex)
+        if self.source_is_mapped:
+            if self._indexer is not None:
+                self.fm.loader.remove(item=self._indexer)
+                self._indexer = None
+            self.lines.close()
+            self.lines = []
+            self.source_is_mapped = False
 
     def open(self):
         self.scroll_begin = 0
@@ -81,6 +104,10 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
         self.scroll_extra = max(0, min(target_scroll, max_scroll))
         self.need_redraw = True
 
+    def damage_key(self):
+        return (self.need_clear_image, self.source, self.image,
+                self.scroll_begin, self.scroll_extra, self.startx)
+
     def draw(self):
         if self.need_clear_image:
             self.need_redraw = True
@@ -146,7 +173,7 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
             self.startx = direction.move(
                 direction=direction.right(),
                 override=narg,
-                maximum=self.max_width,
+                maximum=self._get_max_width(),
                 current=self.startx,
                 pagesize=self.wid,
                 offset=-self.wid + 1)
@@ -158,7 +185,17 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
                 "pagesize": self.hei,
                 "offset": -self.hei + 1,
             }
-            if self.source_is_stream:
+            if self.source_is_mapped and not self.lines.complete:
+                if direction.percentage() or \
+                        (direction.absolute() and direction.down() < 0):
+                    # These need the number of lines
+                    self.lines.index_all()
+                else:
+                    # The size in bytes bounds the number of lines
+                    desired_position = direction.move(
+                        maximum=self.lines.size, **movement)
+                    self.lines.index_lines(desired_position + self.hei)
+            elif self.source_is_stream:
                 # For streams, we first pretend that the content ends much later,
                 # in case there are still unread lines.
                 desired_position = direction.move(
@@ -190,31 +227,61 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
         self._close_source()
 
         self.max_width = 0
+        self._segments = {}
         if isinstance(source, str):
             self.source_is_stream = False
             self.lines = source.splitlines()
-            if self.lines:
-                self.max_width = max(len(line) for line in self.lines)
+            self.max_width = None
         elif hasattr(source, '__getitem__'):
             self.source_is_stream = False
             self.lines = source
-            if self.lines:
-                self.max_width = max(len(line) for line in source)
+            self.max_width = None
         elif hasattr(source, 'readline'):
-            self.source_is_stream = True
-            self.lines = []
+            self.lines = self._map_source(source)
+            self.source_is_mapped = self.lines is not None
+            self.source_is_stream = not self.source_is_mapped
+            if self.source_is_stream:
+                self.lines = []
         else:
             self.source = None
             self.source_is_stream = False
             return False
         self.markup = 'ansi'
 
-        if not self.source_is_stream and strip:
+        if not self.source_is_stream and not self.source_is_mapped and strip:
             self.lines = [line.strip() for line in self.lines]
 
         self.source = source
         return True
 
+    def _map_source(self, source):
+        """Return the lines of a big regular file as MappedLines, else None"""
+        if not PY3:
+            return None
+        try:
+            fileno = source.fileno()
+            stat = os.fstat(fileno)
+            if not S_ISREG(stat.st_mode) or stat.st_size < MIN_MAPPED_SIZE:
+                return None
+            errors = getattr(source, 'errors', None)
+            # Undecodable bytes must not end the paging like they do for streams
+            if errors in (None, 'strict'):
+                errors = 'replace'
+            lines = MappedLines(fileno, getattr(source, 'encoding', None) or 'utf-8',
+                                errors)
+        except (AttributeError, OSError, ValueError, mmap.error):
+            return None
+        if self.index_in_background:
+            self._indexer = Loadable(lines.index_generator(),
+                                     'Indexing lines of ' + getattr(source, 'name', ''))
+            self.fm.loader.add(self._indexer, append=True)
+        return lines
+
+    def _get_max_width(self):
+        if self.max_width is None:
+            self.max_width = max(len(line) for line in self.lines) if self.lines else 0
+        return self.max_width
+
     def click(self, event):
         n = 1 if event.ctrl() else 3
         direction = event.mouse_wheel_direction()
@@ -225,7 +292,7 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
     def _get_line(self, n, attempt_to_read=True):
         assert isinstance(n, int), n
         try:
-            return self.lines[n]
+            line = self.lines[n]
         except (KeyError, IndexError):
             if attempt_to_read and self.source_is_stream:
                 try:
@@ -238,6 +305,25 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
                     pass
                 return self._get_line(n, attempt_to_read=False)
             return ""
+        if self.source_is_mapped:
+            self.max_width = max(self.max_width, len(line))
+        return line
+
+    def _get_segments(self, i, line):
+        """Return the length and the ansi segments of line i, tabs expanded"""
+        try:
+            cached_line, length, segments = self._segments[i]
+        except KeyError:
+            pass
+        else:
+            if cached_line is line:
+                return length, segments
+        if len(self._segments) >= MAX_SEGMENTED_LINES:
+            self._segments.clear()
+        expanded = line.expandtabs(4)
+        segments = ansi.split_segments(expanded)
+        self._segments[i] = (line, len(expanded), segments)
+        return len(expanded), segments
 
     def _generate_lines(self, starty, startx):
         i = starty
@@ -245,14 +331,18 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
             return
         while True:
             try:
-                line = self._get_line(i).expandtabs(4)
+                if self.markup == 'ansi':
+                    length, segments = self._get_segments(i, self._get_line(i))
+                else:
+                    line = self._get_line(i).expandtabs(4)
+                    length = len(line)
                 for part in ((0,) if not
                              self.fm.settings.wrap_plaintext_previews else
-                             range(max(1, ((len(line) - 1) // self.wid) + 1))):
+                             range(max(1, ((length - 1) // self.wid) + 1))):
                     shift = part * self.wid
                     if self.markup == 'ansi':
-                        line_bit = (ansi.char_slice(line, startx + shift,
-                                                    self.wid + shift)
+                        line_bit = (ansi.slice_segments(segments, startx + shift,
+                                                        self.wid + shift)
                                     + ansi.reset)
                     else:
                         line_bit = line[startx + shift:self.wid + startx
@@ -56,6 +56,16 @@ class StatusBar(Widget):  # pylint: disable=too-many-instance-attributes
     def clear_message(self):
         self.msg = None
 
+    def damage_key(self):
+        thisfile = self.fm.thisfile
+        ctime = -1
+        if thisfile and not self.hint and not self.msg:
+            thisfile.load_if_outdated()
+            ctime = getattr(thisfile.stat, 'st_ctime', -1)
+        return (self.fm.ui.browser.main_column, self.hint, self.msg,
+                self.msg is not None and self.msg.is_alive(), thisfile, ctime,
+                strftime('%M', localtime()), self.result is None)
+
     def draw(self):  # pylint: disable=too-many-branches
         """Draw the statusbar"""
 
@@ -260,6 +270,8 @@ class StatusBar(Widget):  # pylint: disable=too-many-instance-attributes
             if len(target.marked_items) == target.size:
                 side.add(human_readable(target.disk_usage, separator=''), 'size')
             else:
+                for fobj in target.marked_items:
+                    fobj.load_once()
                 sumsize = sum(f.size for f in target.marked_items
                               if not f.is_directory or f.cumulative_size_calculated)
                 side.add(human_readable(sumsize, separator=''), 'size')
@@ -294,19 +306,13 @@ class StatusBar(Widget):  # pylint: disable=too-many-instance-attributes
 
     #add by sim1
     def _get_rating_infostring(self, side):
-        target = self.fm.thisfile.path
-        stars = ''
-        if self.fm.rating_info:
-            for ratings in self.fm.rating_info:
-                if ratings["path"] == target:
-                    for i in range(int(ratings["star"])):
-                        if 'DISPLAY' in os.environ:
-                            stars += ''
-                        else:
-                            stars += '★'
-
-                    side.add(stars, 'stars')
-                    return True
+        stars = self.fm.ratings.get(self.fm.thisfile.path)
+        if stars:
+            if 'DISPLAY' in os.environ:
+                side.add('' * stars, 'stars')
+            else:
+                side.add('★' * stars, 'stars')
+            return True
 
         return False
 
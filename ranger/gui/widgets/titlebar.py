@@ -31,14 +31,19 @@ class TitleBar(Widget):
     def request_redraw(self):
         self.need_redraw = True
 
+    def damage_key(self):
+        return (self.fm.thisfile, str(self.fm.ui.keybuffer), self.wid, self.throbber)
+
     def draw(self):
+        keybuffer = str(self.fm.ui.keybuffer)
         if self.need_redraw or \
                 self.fm.thisfile != self.old_thisfile or\
-                str(self.fm.ui.keybuffer) != str(self.old_keybuffer) or\
+                keybuffer != self.old_keybuffer or\
                 self.wid != self.old_wid:
             self.need_redraw = False
             self.old_wid = self.wid
             self.old_thisfile = self.fm.thisfile
+            self.old_keybuffer = keybuffer
             self._calc_bar()
         self._print_result(self.result)
         if self.wid > 2:
@@ -31,6 +31,20 @@ class ViewBase(Widget, DisplayableContainer):  # pylint: disable=too-many-instan
     def request_clear(self):
         self.need_clear = True
 
+    def damage_key(self):
+        if self.need_clear:
+            return None
+        keys = [self.draw_bookmarks, self.draw_info,
+                self.draw_hints and str(self.fm.ui.keybuffer)]
+        for displayable in self.container:
+            keys.append(displayable.visible)
+            if displayable.visible:
+                key = displayable.damage_key()
+                if key is None or displayable.need_redraw:
+                    return None
+                keys.append(key)
+        return tuple(keys)
+
     def draw(self):
         if self.need_clear:
             self.win.erase()
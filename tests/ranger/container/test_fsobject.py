@@ -1,8 +1,22 @@
 from __future__ import (absolute_import, division, print_function)
 
+import gc
+import mimetypes
 import operator
+import os
 
+import pytest
+
+from ranger.container.directory import natural_sort_keys
+from ranger.container.file import File
 from ranger.container.fsobject import FileSystemObject
+from ranger.core.shared import FileManagerAware, SettingsAware
+from ranger.ext.openstruct import OpenStruct
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # pylint: disable=invalid-name
 
 
 class MockFM(object):  # pylint: disable=too-few-public-methods
@@ -53,3 +67,57 @@ def test_basename_natural2():
     ]
     assert fsos == sorted(fsos[::-1], key=operator.attrgetter("basename_natural"))
     assert fsos == sorted(fsos[::-1], key=operator.attrgetter("basename_natural_lower"))
+
+
+def test_natural_sort_keys():
+    """Test that the batch keys order like basename_natural."""
+    fsos = [
+        create_filesystem_object(path)
+        for path in (
+            "0", "00", "1", "01", "2", "10", "100", "a", "a-1", "a.1", "a0",
+            "a007", "a7b", "a10", "A10", "b", "hello²", "hello1.txt",
+            "hello12", "hello12.txt", "x9y9", "x9y10", "x10y1",
+        )
+    ]
+    for icase, attr in ((False, "basename_natural"), (True, "basename_natural_lower")):
+        keys = natural_sort_keys(fsos, case_insensitive=icase)
+        by_keys = [fso for _, fso in sorted(zip(keys, fsos), key=operator.itemgetter(0))]
+        assert [operator.attrgetter(attr)(fso) for fso in by_keys] == \
+            sorted(operator.attrgetter(attr)(fso) for fso in fsos)
+
+
+@pytest.mark.skipif(tracemalloc is None, reason="needs tracemalloc")
+def test_file_memory_budget(tmpdir, monkeypatch):
+    """Test the memory used per loaded and drawn file."""
+    monkeypatch.setattr(SettingsAware, "settings", OpenStruct(
+        freeze_files=False, binary_size_prefix=True, size_separator_space=False,
+    ), raising=False)
+    monkeypatch.setattr(FileManagerAware, "fm", OpenStruct(
+        default_linemodes=[], mimetypes=mimetypes.MimeTypes(),
+        update_preview=lambda path: None,
+    ), raising=False)
+    count = 2000
+    for i in range(count):
+        tmpdir.join("file%d.txt" % i).write("")
+    stats = [(path, os.lstat(path)) for path in (str(p) for p in tmpdir.listdir())]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        files = []
+        for path, stat in stats:
+            fobj = File(path, preload=(stat, stat), path_is_abs=True)
+            fobj.load()
+            # What sorting and drawing typically look at
+            fobj.extension  # pylint: disable=pointless-statement
+            fobj.relative_path_lower  # pylint: disable=pointless-statement
+            fobj.mimetype_tuple  # pylint: disable=pointless-statement
+            fobj.linemode  # pylint: disable=pointless-statement
+            files.append(fobj)
+        gc.collect()
+        per_file = (tracemalloc.get_traced_memory()[0] - before) / count
+    finally:
+        tracemalloc.stop()
+
+    assert per_file < 1000
@@ -0,0 +1,28 @@
+from __future__ import (absolute_import, division, print_function)
+
+from ranger.container.ratings import Ratings
+
+
+def test_ratings_journal(tmpdir):
+    filename = str(tmpdir.join("ratings"))
+    rated = [str(tmpdir.join(name)) for name in ("a", "b", "c")]
+    for path in rated:
+        with open(path, "w"):
+            pass
+
+    ratings = Ratings(filename)
+    ratings.update(rated[0], 2)
+    ratings.update(rated[1], 5)
+    ratings.update(rated[0], 1)
+    ratings.update(rated[1], -5)
+    with open(filename) as fobj:
+        assert len(fobj.readlines()) == 4  # one line per change
+
+    ratings = Ratings(filename)
+    assert ratings.ratings == {rated[0]: 3}
+
+    ratings.update(rated[2], 1)
+    ratings.compact(force=True)
+    with open(filename) as fobj:
+        assert len(fobj.readlines()) == 2
+    assert Ratings(filename).ratings == {rated[0]: 3, rated[2]: 1}
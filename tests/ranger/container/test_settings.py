@@ -0,0 +1,37 @@
+from __future__ import (absolute_import, division, print_function)
+
+from ranger.container.settings import Settings
+from ranger.container.tags import Tags
+from ranger.core.shared import FileManagerAware
+from ranger.ext.openstruct import OpenStruct
+
+
+def test_local_settings_resolution(monkeypatch, tmpdir):
+    tags = Tags(str(tmpdir.join("tagged")))
+    fm = OpenStruct(thisdir=OpenStruct(path="/home/user/music"), tags=tags)
+    monkeypatch.setattr(FileManagerAware, "fm", fm, raising=False)
+    settings = Settings()
+
+    settings.set("sort", "natural")
+    assert settings.sort == "natural"
+
+    settings.set("sort", "mtime", path="/music$")
+    assert settings.sort == "mtime"
+    assert settings.get("sort", "/home/user") == "natural"
+
+    # Changing the global value shows through the remembered resolution
+    settings.set("sort", "size")
+    assert settings.get("sort", "/home/user") == "size"
+    assert settings.sort == "mtime"
+
+    fm.thisdir = OpenStruct(path="/home/user")
+    assert settings.sort == "size"
+
+    path = str(tmpdir)
+    assert settings.get("sort", path) == "size"
+    settings.set("sort", "atime", tags=["x"])
+    assert settings.get("sort", path) == "size"
+    tags.add(path, tag="x")
+    assert settings.get("sort", path) == "atime"
+    tags.remove(path)
+    assert settings.get("sort", path) == "size"
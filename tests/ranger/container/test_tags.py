@@ -97,3 +97,57 @@ def test_update_path_does_not_rename_partial_prefix_match(tmpdir):
     tags.update_path("/tmp/foo", "/new/foo")
 
     assert tags.tags == {"/tmp/foobar/file": "*"}
+
+
+def test_changes_are_appended_and_synced(tmpdir):
+    tagfile = _write_tagfile(tmpdir, ["/tmp/%d" % i for i in range(10)])
+    tags = Tags(tagfile)
+    other = Tags(tagfile)
+
+    with tags.batch():
+        tags.remove("/tmp/1")
+        tags.add("/tmp/new", tag="a")
+    with open(tagfile, encoding="utf-8") as fobj:
+        assert fobj.read().splitlines()[10:] == [" :/tmp/1", "a:/tmp/new"]
+
+    other.sync()
+    assert other.tags == tags.tags
+    assert "/tmp/1" not in other and other.marker("/tmp/new") == "a"
+
+
+def test_sync_rereads_file_rewritten_in_place(tmpdir):
+    tagfile = _write_tagfile(tmpdir, ["/tmp/a", "/tmp/b"])
+    tags = Tags(tagfile)
+
+    # Older versions rewrite the file in place, keeping its inode
+    with open(tagfile, "w", encoding="utf-8") as fobj:
+        fobj.write(u"/tmp/b\n/tmp/c\n/tmp/long/path\n")
+    tags.sync()
+    assert tags.tags == {"/tmp/b": "*", "/tmp/c": "*", "/tmp/long/path": "*"}
+
+
+def test_journal_is_compacted(tmpdir):
+    tagfile = _write_tagfile(tmpdir, ["/tmp/a", "/tmp/b"])
+    tags = Tags(tagfile)
+
+    for _ in range(3):
+        tags.toggle("/tmp/a")
+
+    assert tags.tags == {"/tmp/b": "*"}
+    assert Tags(tagfile).tags == tags.tags
+    with open(tagfile, encoding="utf-8") as fobj:
+        assert len(fobj.readlines()) <= 2 * len(tags.tags)
+
+
+def test_paths_under(tmpdir):
+    tagfile = _write_tagfile(tmpdir, [
+        "/tmp/foo", "/tmp/foo/a", "/tmp/foo/sub/b", "/tmp/foobar", "/tmp/fo",
+        "/tmp/foo-x",
+    ])
+    tags = Tags(tagfile)
+
+    assert tags.paths_under("/tmp/foo") == ["/tmp/foo", "/tmp/foo/a", "/tmp/foo/sub/b"]
+    tags.add("/tmp/foo/c")
+    tags.remove("/tmp/foo/a")
+    assert tags.paths_under("/tmp/foo/") == ["/tmp/foo/c", "/tmp/foo/sub/b"]
+    assert tags.paths_under("/") == sorted(tags.tags)
@@ -0,0 +1,63 @@
+from __future__ import (absolute_import, division, print_function)
+
+import os
+from time import time
+
+from ranger.core.cumulative_size import CumulativeSizeCache
+
+
+def _total(cache, path):
+    size = None
+    for size, _ in cache.walk(path):
+        pass
+    return size
+
+
+def test_cumulative_size_counts_hard_links_once(tmpdir):
+    tmpdir.join("file").write("x" * 100)
+    subdir = tmpdir.mkdir("subdir")
+    subdir.join("other").write("x" * 10)
+    os.link(str(subdir.join("other")), str(subdir.join("link1")))
+    os.link(str(subdir.join("other")), str(tmpdir.join("link2")))
+
+    assert _total(CumulativeSizeCache(), str(tmpdir)) == 110
+
+
+def test_cumulative_size_reuses_subtotals(tmpdir):
+    subdir = tmpdir.mkdir("subdir")
+    subdir.join("file").write("x" * 10)
+    cache = CumulativeSizeCache()
+    assert _total(cache, str(subdir)) == 10
+
+    listed = []
+    original = cache._list_directory  # pylint: disable=protected-access
+
+    def list_directory(path, result):
+        listed.append(path)
+        return original(path, result)
+
+    cache._list_directory = list_directory  # pylint: disable=protected-access
+    tmpdir.join("file").write("x" * 5)
+    assert _total(cache, str(tmpdir)) == 15
+    assert listed == [str(tmpdir)]
+
+    subdir.join("new").write("x")
+    assert _total(cache, str(tmpdir)) == 16
+    assert listed == [str(tmpdir), str(subdir)]
+
+
+def test_cumulative_size_since_lists_again(tmpdir):
+    tmpdir.join("file").write("x" * 10)
+    cache = CumulativeSizeCache()
+    assert _total(cache, str(tmpdir)) == 10
+
+    # Growing a file in place leaves the mtime of the directory alone
+    mtime = os.stat(str(tmpdir)).st_mtime
+    with open(str(tmpdir.join("file")), "a") as fobj:
+        fobj.write("x" * 5)
+    os.utime(str(tmpdir), (mtime, mtime))
+    assert _total(cache, str(tmpdir)) == 10
+
+    since = time()
+    sizes = [size for size, _ in cache.walk(str(tmpdir), since)]
+    assert sizes[-1] == 15
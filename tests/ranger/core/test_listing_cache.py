@@ -0,0 +1,61 @@
+from __future__ import (absolute_import, division, print_function)
+
+import os
+
+from ranger.ext.scan_dir import stat_entry
+from ranger.core.listing_cache import ListingCache
+
+
+def _make_listing(tmpdir, count):
+    for i in range(count):
+        tmpdir.join("file%d" % i).write("x" * i)
+    tmpdir.mkdir("subdir")
+    os.symlink("file1", str(tmpdir.join("link")))
+    names = sorted(str(path) for path in tmpdir.listdir())
+    return [stat_entry(name) for name in names]
+
+
+def test_listing_cache_roundtrip(tmpdir):
+    listdir = tmpdir.mkdir("listed")
+    entries = _make_listing(listdir, 5)
+    path = str(listdir)
+    mtime = os.stat(path).st_mtime
+    cache = ListingCache(str(tmpdir.join("cache")))
+    cache.min_entries = 0
+
+    cache.store(path, mtime, [(name, stats) for name, stats, _ in entries])
+    # Use a fresh instance, like a restarted ranger would
+    cached = ListingCache(str(tmpdir.join("cache"))).get(path, mtime)
+
+    assert [name for name, _, _ in cached] == [name for name, _, _ in entries]
+    for (_, stats, is_dir), (_, cached_stats, cached_is_dir) in zip(entries, cached):
+        assert is_dir == cached_is_dir
+        assert stats[0].st_size == cached_stats[0].st_size
+        assert stats[0].st_mtime == cached_stats[0].st_mtime
+        assert stats[1].st_mode == cached_stats[1].st_mode
+
+
+def test_listing_cache_rejects_other_mtime(tmpdir):
+    listdir = tmpdir.mkdir("listed")
+    entries = _make_listing(listdir, 3)
+    path = str(listdir)
+    mtime = os.stat(path).st_mtime
+    cache = ListingCache(str(tmpdir.join("cache")))
+    cache.min_entries = 0
+
+    cache.store(path, mtime, [(name, stats) for name, stats, _ in entries])
+
+    assert cache.get(path, mtime + 1) is None
+    assert cache.get(path + "/subdir", mtime) is None
+
+
+def test_listing_cache_skips_small_directories(tmpdir):
+    listdir = tmpdir.mkdir("listed")
+    entries = _make_listing(listdir, 3)
+    path = str(listdir)
+    mtime = os.stat(path).st_mtime
+    cache = ListingCache(str(tmpdir.join("cache")))
+
+    cache.store(path, mtime, [(name, stats) for name, stats, _ in entries])
+
+    assert cache.get(path, mtime) is None